@@ -15,5 +15,12 @@
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
 
 
-from .src import vsa_gui
-vsa_gui.main()
\ No newline at end of file
+import sys
+
+if (len(sys.argv) > 1) and (sys.argv[1] == "batch"):
+    # The batch command runs without Qt
+    from .src import vsa_batch
+    sys.exit(vsa_batch.main(sys.argv[2:]))
+else:
+    from .src import vsa_gui
+    vsa_gui.main()
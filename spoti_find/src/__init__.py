@@ -15,14 +15,23 @@
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
 
 
-from . import vsa_gui
+# vsa_gui and vsa_viewer are imported when used, and are left out of __all__, so that the
+# package loads without Qt
+from . import vsa_core
 from . import vsa
-from . import vsa_viewer
 from . import polygon_tools
+from . import polygon
+from . import tile_stats
+from . import lru_cache
+from . import pipeline
+from . import artifact_sink
+from . import spot_table
+from . import vsa_results
+from . import vsa_batch
 
 # src/__init__.py
 
 # Import necessary modules or sub-packages
 
 # Define what should be accessible when importing the package
-__all__ = ['vsa_gui','vsa','vsa_viewer','polygon_tools']
\ No newline at end of file
+__all__ = ['vsa_core','vsa','polygon_tools','polygon','tile_stats','lru_cache','pipeline','artifact_sink','spot_table','vsa_results','vsa_batch']
\ No newline at end of file
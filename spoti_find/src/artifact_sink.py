@@ -0,0 +1,124 @@
+# Spoti-find - Copyright (C) 2025 The Jackson Laboratory, Inc.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+
+"""
+Copyright The Jackson Laboratory, 2025
+
+Destinations for the debug images written by VsaProcessor, such as the distance
+map and the spot mask.  The default sink discards them, so the images are only
+written when a DirectorySink, or a ThreadedSink wrapping one, is set on the
+processor.
+"""
+import os
+import queue
+import threading
+import cv2
+
+
+class ArtifactSink():
+    '''
+    Discards all artifacts.  Callers check enabled before preparing an artifact, so a
+    disabled sink costs nothing.
+    '''
+    enabled = False
+
+    def write(self, name, images):
+        '''
+        Writes the list of images under name, as a multi-page file when there are several.
+        '''
+        return
+
+    def close(self):
+        return
+
+
+class DirectorySink(ArtifactSink):
+    '''
+    Writes each artifact to a file of the given name in directory.  VsaProcessor names
+    the artifacts after their image, so one sink can be shared by several images.
+    '''
+    enabled = True
+
+    def __init__(self, directory):
+        self.directory = directory
+        return
+
+    def write(self, name, images):
+        os.makedirs(self.directory, exist_ok=True)
+        pathname = os.path.join(self.directory, name)
+        if len(images) == 1:
+            return cv2.imwrite(pathname, images[0])
+        return cv2.imwritemulti(pathname, images)
+
+
+class ThreadedSink(ArtifactSink):
+    '''
+    Passes artifacts to another sink from a background thread, so the caller never waits
+    on the file system.  The images are copied, since the caller may change them after
+    write() returns.  When max_pending artifacts are already waiting, new ones are dropped
+    and counted in dropped rather than blocking the caller.
+    '''
+    enabled = True
+
+    def __init__(self, sink, max_pending=8):
+        self.sink = sink
+        self.pending = queue.Queue(maxsize=max_pending)
+        self.dropped = 0
+        self.failed = 0
+        self.thread = None
+        self.lock = threading.Lock()
+        # dropped and failed have a lock of their own, as close() holds lock while the
+        # thread finishes, and the thread may count a failure then
+        self.count_lock = threading.Lock()
+        return
+
+    def write(self, name, images):
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, daemon=True)
+                self.thread.start()
+        try:
+            self.pending.put_nowait((name, [img.copy() for img in images]))
+        except queue.Full:
+            with self.count_lock:
+                self.dropped += 1
+        return
+
+    def close(self):
+        '''
+        Waits for the pending artifacts to be written and stops the thread.
+        '''
+        with self.lock:
+            if self.thread is None:
+                return
+            self.pending.put(None)
+            self.thread.join()
+            self.thread = None
+        return
+
+    def _run(self):
+        while True:
+            item = self.pending.get()
+            if item is None:
+                return
+            try:
+                written = self.sink.write(*item) is not False
+            except Exception:
+                written = False
+            if not written:
+                with self.count_lock:
+                    self.failed += 1
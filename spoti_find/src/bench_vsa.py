@@ -0,0 +1,624 @@
+# Spoti-find - Copyright (C) 2025 The Jackson Laboratory, Inc.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+
+"""
+Benchmarks for the VsaProcessor stages.  Run from the repository root:
+
+    python -m spoti_find.src.bench_vsa [benchmark_name ...]
+
+The images in Validation/ are used by default; set VSA_BENCH_IMAGES to a glob
+pattern to use other images.
+"""
+import os
+import sys
+import io
+import csv
+import json
+import math
+import glob
+import time
+import contextlib
+import tracemalloc
+import numpy as np
+import cv2
+from .vsa import VsaProcessor
+from . import vsa_core as core
+from .area_volume_map import AreaVolumeMap
+from .polygon import Polygon
+from . import polygon_tools as pt
+from . import tile_stats as ts
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_IMAGES = os.path.join(REPO_DIR, "Validation", "*.tif.tif")
+VALIDATION_DATA = os.path.join(REPO_DIR, "Validation", "VSAValidationData.csv")
+CALIBRATION_FILE = os.path.join(REPO_DIR, "Calibration", "Whatmancalibration.txt")
+
+
+def best_time(func, repeat=3):
+    """ Returns the shortest of several run times of func, in seconds, and the last result. """
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = func()
+        elapsed = time.perf_counter() - start
+        if (best is None) or (elapsed < best):
+            best = elapsed
+    return best, result
+
+
+def peak_memory(func):
+    """ Returns the peak memory, in bytes, allocated through Python and NumPy while running func. """
+    tracemalloc.start()
+    with contextlib.redirect_stdout(io.StringIO()):
+        func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def legacy_extend_image(img, paper_mask):
+    """ The list based VsaProcessor.extend_image() that preceded the histogram median, for comparison. """
+    tmp_list = np.where(paper_mask>0, img, 0).flatten().tolist()
+    tmp_list = [x for x in tmp_list if x > 0]
+    img_median = np.median(tmp_list)
+    img_type = type(img[0][0])
+    return np.where(paper_mask>0, img, img_median).astype(img_type)
+
+
+def legacy_find_spots_in_rect(img_extended, img_median, roi, threshold_adjustment=0, min_range=0, min_dist_from_median=10):
+    """
+    The baseline VsaProcessor._find_spots_in_rect(), for comparison, returning only the
+    mask of the tile, without the tile's debug print and its polygons.
+    """
+    x = roi[0]
+    y = roi[1]
+    w = roi[2]
+    h = roi[3]
+    roi_img = img_extended[y:y+h, x:x+w]
+    tmp_list = roi_img.flatten().tolist()
+    tmp_list = np.sort(tmp_list)
+    min_val = tmp_list[0]
+    max_val = tmp_list[-1]
+    roi_range = max_val - min_val
+
+    triangle_weight = 0.0
+    thresh_otsu, _ = cv2.threshold(roi_img, 0, 255, cv2.THRESH_BINARY+cv2.THRESH_OTSU)
+    thresh_triangle, _ = cv2.threshold(roi_img, 0, 255, cv2.THRESH_BINARY+cv2.THRESH_TRIANGLE)
+    thresh = int((1.0-triangle_weight)*thresh_otsu+(triangle_weight)*thresh_triangle)
+    thresh = thresh + threshold_adjustment
+    thresh = max(1, min(thresh, 255))
+
+    _, roi_mask = cv2.threshold(roi_img, thresh, 255, cv2.THRESH_BINARY)
+
+    if (roi_mask is None) or (not np.any(roi_mask)):
+        return None
+    if thresh < img_median:
+        return None
+    if roi_range < min_range:
+        return None
+    if (thresh - img_median) < min_dist_from_median:
+        return None
+    return roi_mask
+
+
+def legacy_segment_spots(img_extended, img_median, paper_mask, win_size, threshold_adjustment=0, min_range=40, min_dist_from_median=10):
+    """
+    The baseline VsaProcessor.segment_spots(), which thresholded every win_size tile of the
+    image in turn, for comparison.  Returns the spot mask, without writing the debug stack.
+    """
+    h, w = img_extended.shape
+
+    x_count = math.ceil(w / win_size)
+    y_count = math.ceil(h / win_size)
+    tiles = []
+    for y_idx in range(y_count):
+        for x_idx in range(x_count):
+            x1 = x_idx * win_size
+            y1 = y_idx * win_size
+            x2 = min((x1+win_size), w)
+            y2 = min((y1+win_size), h)
+            tiles.append([x1, y1, x2, y2])
+
+    spot_mask = np.zeros((h, w))
+    for tile in tiles:
+        roi = [tile[0], tile[1], (tile[2]-tile[0]), (tile[3]-tile[1])]
+        roi_mask = legacy_find_spots_in_rect(img_extended, img_median, roi, threshold_adjustment, min_range, min_dist_from_median)
+        if roi_mask is not None:
+            spot_mask[tile[1]:tile[3], tile[0]:tile[2]] = roi_mask
+
+    spot_mask = spot_mask.astype(np.uint8)
+    return np.where(paper_mask==0, 0, spot_mask)
+
+
+def legacy_polygon_perimeter(pt_list):
+    """ The baseline list based polygon_tools.polygon_perimeter(), for comparison. """
+    sum = 0.0
+    for idx in range(len(pt_list)-1):
+        dx = pt_list[idx+1][0] - pt_list[idx][0]
+        dy = pt_list[idx+1][1] - pt_list[idx][1]
+        sum += math.sqrt(dx*dx + dy*dy)
+
+    dx = pt_list[0][0] - pt_list[-1][0]
+    dy = pt_list[0][1] - pt_list[-1][1]
+    sum += math.sqrt(dx*dx + dy*dy)
+    return sum
+
+
+def legacy_polygon_signed_area(pt_list):
+    """ The baseline list based polygon_tools.polygon_signed_area(), for comparison. """
+    if (pt_list is None) or (len(pt_list) < 3):
+        return 0.0
+    sum = 0.0
+    for idx in range(len(pt_list)-1):
+        sum += (pt_list[idx][1]*pt_list[idx+1][0] - pt_list[idx][0]*pt_list[idx+1][1])
+
+    if (pt_list[0][0] != pt_list[-1][0]) or (pt_list[0][1] != pt_list[-1][1]):
+        sum += (pt_list[-1][1]*pt_list[0][0] - pt_list[-1][0]*pt_list[0][1])
+
+    sum /= 2.0
+    return sum
+
+
+def legacy_polygon_area(pt_list):
+    """ The baseline list based polygon_tools.polygon_area(), for comparison. """
+    area = legacy_polygon_signed_area(pt_list)
+    if area < 0.0:
+        area *= -1.0
+    return area
+
+
+def legacy_polygon_mbr(polygon):
+    """ The baseline list based polygon_tools.polygon_mbr(), for comparison. """
+    x_coords = [pt[0] for pt in polygon]
+    y_coords = [pt[1] for pt in polygon]
+    x = min(x_coords)
+    w = max(x_coords) - x + 1
+    y = min(y_coords)
+    h = max(y_coords) - y +1
+    return (x, y, w, h)
+
+
+def legacy_largest_contour(contours):
+    """ The baseline polygon_tools.largest_contour(), which converted every contour to a list, for comparison. """
+    if contours is None:
+        return -1
+
+    polygons = []
+    for contour in contours:
+        polygon = []
+        for obj in contour.tolist():
+            polygon.append(obj[0])
+        polygons.append(polygon)
+    if len(polygons) <= 0:
+        return -1
+    max_area = 0.0
+    max_idx = 0
+    for idx in range(len(polygons)):
+        area = legacy_polygon_area(polygons[idx])
+        if area > max_area:
+            max_area = area
+            max_idx = idx
+    return max_idx
+
+
+class BenchVsa:
+    def __init__(self):
+        self.bench_list = {
+            'segment_spots':self.segment_spots,
+            'extend_image':self.extend_image,
+            'polygon':self.polygon,
+            'pyramid':self.pyramid,
+            'quadtree':self.quadtree,
+            'local_threshold':self.local_threshold,
+            'analysis_resolution':self.analysis_resolution,
+            'paper':self.paper,
+            'threads':self.threads
+        }
+        pattern = os.environ.get("VSA_BENCH_IMAGES", DEFAULT_IMAGES)
+        self.image_files = sorted(glob.glob(pattern))
+
+    def run_all(self):
+        for key in self.bench_list:
+            self.run_bench(key)
+        return
+
+    def run_bench(self, bench_name):
+        print(f"{bench_name}:")
+        if bench_name not in self.bench_list:
+            print("BENCHMARK NOT FOUND")
+            return False
+        self.bench_list[bench_name]()
+        return True
+
+    def open_processor(self, filename):
+        processor = VsaProcessor()
+        if not processor.open_image(filename):
+            return None
+        processor.segment_paper(processor.get_default_paper_threshold())
+        return processor
+
+    def segment_spots(self):
+        '''
+        Spot mask construction, the baseline loop over every tile of the image, tile-by-tile
+        over the candidate tiles, and all candidate tiles at once.  The speedup is that of
+        the block engine over the baseline.
+        '''
+        total = {"baseline": 0.0, "tile": 0.0, "block": 0.0}
+        funcs = {"tile": core.tile_spot_mask, "block": core.block_spot_mask}
+        for filename in self.image_files:
+            processor = self.open_processor(filename)
+            if processor is None:
+                continue
+            masks = {}
+            times = {}
+            params = processor.spot_params(0, 25, 10)
+            paper = processor.paper
+            img_extended = np.where(paper.mask>0, processor.img, paper.median).astype(processor.img.dtype)
+            times["baseline"], baseline_mask = best_time(
+                lambda: legacy_segment_spots(img_extended, paper.median, paper.mask, params.win_size,
+                                             params.threshold_adjustment, params.min_range, params.min_dist_from_median),
+                repeat=1)
+            x, y, w, h = processor.paper_crop
+            masks["baseline"] = baseline_mask[y:y+h, x:x+w]
+            for engine, func in funcs.items():
+                times[engine], mask = best_time(lambda: func(paper, processor.paper_crop, params))
+                masks[engine] = np.where(paper.mask[y:y+h, x:x+w]==0, 0, mask).astype(np.uint8)
+            for engine in total:
+                total[engine] += times[engine]
+            same = all(np.array_equal(masks["baseline"], masks[engine]) for engine in funcs)
+            print(f"    {os.path.basename(filename)}: baseline {times['baseline']*1000:.1f} ms, "
+                  f"tile {times['tile']*1000:.1f} ms, block {times['block']*1000:.1f} ms, "
+                  f"speedup {times['baseline']/times['block']:.1f}x, identical {same}")
+        if total["block"] > 0.0:
+            print(f"    total: baseline {total['baseline']:.2f} s, tile {total['tile']:.2f} s, "
+                  f"block {total['block']:.2f} s, speedup {total['baseline']/total['block']:.1f}x")
+
+    def extend_image(self):
+        '''
+        Time and peak memory of vsa_core.extend_image(), list based versus histogram based.  The
+        first image is also scaled up to 6000 x 4000 to show the cost on a full size scan.
+        '''
+        cases = []
+        for filename in self.image_files:
+            processor = self.open_processor(filename)
+            if processor is not None:
+                cases.append((os.path.basename(filename), processor))
+        if cases:
+            name, small = cases[0]
+            img = cv2.resize(small.img, (6000, 4000), interpolation=cv2.INTER_LINEAR)
+            paper_mask = cv2.resize(small.paper_mask, (6000, 4000), interpolation=cv2.INTER_NEAREST)
+            crop = core.tile_crop(cv2.boundingRect(paper_mask), small.win_size, img.shape)
+            cases.append((f"{name} at 6000x4000", (img, paper_mask, crop)))
+
+        for name, case in cases:
+            if isinstance(case, VsaProcessor):
+                case = (case.img, case.paper_mask, case.paper_crop)
+            img, paper_mask, crop = case
+            legacy_time, legacy_img = best_time(lambda: legacy_extend_image(img, paper_mask), repeat=1)
+            new_time, (_, _, extended) = best_time(lambda: core.extend_image(img, paper_mask, crop))
+            legacy_peak = peak_memory(lambda: legacy_extend_image(img, paper_mask))
+            new_peak = peak_memory(lambda: core.extend_image(img, paper_mask, crop))
+            x, y, w, h = crop
+            same = np.array_equal(legacy_img[y:y+h, x:x+w], extended)
+            print(f"    {name}: list {legacy_time*1000:.1f} ms / {legacy_peak/2**20:.1f} MB, "
+                  f"histogram {new_time*1000:.1f} ms / {new_peak/2**20:.1f} MB, identical {same}")
+
+
+    def polygon(self):
+        '''
+        Polygon measurements, the baseline list based functions and the polygon_tools
+        functions on lists, which convert them to a Polygon, versus Polygon on the contour
+        arrays, over the spot and paper contours of the images.  The Polygon times include
+        creating the Polygon and the first, uncached, computation.
+        '''
+        spot_contours = []
+        paper_contours = []
+        for filename in self.image_files:
+            processor = self.open_processor(filename)
+            if processor is None:
+                continue
+            with contextlib.redirect_stdout(io.StringIO()):
+                processor.segment_spots(0, 25, 10)
+            spot_contours += processor.spot_polygons.to_contours()
+            paper_contours.append(pt.polygon_to_contour(processor.paper_polygon))
+
+        legacy_funcs = {'perimeter':legacy_polygon_perimeter, 'area':legacy_polygon_area, 'bbox':legacy_polygon_mbr}
+        list_funcs = {'perimeter':pt.polygon_perimeter, 'area':pt.polygon_area, 'bbox':pt.polygon_mbr}
+        for name, contours in [("spots", spot_contours), ("papers", paper_contours)]:
+            if len(contours) == 0:
+                continue
+            lists = [pt.contour_to_polygon(contour) for contour in contours]
+            points = [contour.reshape(-1, 2) for contour in contours]
+            print(f"    {name}: {len(contours)} contours of {np.mean([len(p) for p in points]):.0f} points on average")
+            for prop, legacy_func in legacy_funcs.items():
+                legacy_time, _ = best_time(lambda: [legacy_func(p) for p in lists])
+                list_time, _ = best_time(lambda: [list_funcs[prop](p) for p in lists])
+                array_time, _ = best_time(lambda: [getattr(Polygon(p), prop) for p in points])
+                print(f"        {prop}: baseline lists {legacy_time*1e6/len(contours):.1f} us, "
+                      f"polygon_tools on lists {list_time*1e6/len(contours):.1f} us, "
+                      f"Polygon {array_time*1e6/len(contours):.1f} us per contour")
+            cached = [Polygon(p) for p in points]
+            _ = [p.perimeter for p in cached]
+            cached_time, _ = best_time(lambda: [p.perimeter for p in cached])
+            print(f"        cached perimeter: {cached_time*1e6/len(contours):.2f} us per contour")
+            legacy_time, legacy_idx = best_time(lambda: legacy_largest_contour(contours))
+            new_time, new_idx = best_time(lambda: pt.largest_contour(contours))
+            print(f"        largest_contour: baseline lists {legacy_time*1000:.1f} ms, cv2 {new_time*1000:.1f} ms, "
+                  f"same {legacy_idx == new_idx}")
+
+    def pyramid(self):
+        '''
+        End-to-end latency of one image, from opening it to measuring its spots, at full
+        resolution and with the paper segmented on 1/4 and 1/8 images, and the fraction
+        of the paper and spot pixels that differ from full resolution.
+        '''
+        volume_mapper = AreaVolumeMap()
+        volume_mapper.c1 = 5.0
+        scales = [1, 4, 8]
+        total = {scale: 0.0 for scale in scales}
+        worst = {scale: (0.0, 0.0) for scale in scales}
+        for filename in self.image_files:
+            masks = {}
+            for scale in scales:
+                def run():
+                    processor = VsaProcessor()
+                    processor.pyramid_scale = scale
+                    processor.open_image(filename)
+                    processor.segment_paper(processor.get_default_paper_threshold())
+                    processor.segment_spots(0, 25, 10)
+                    processor.measure_spots(volume_mapper, 40.0, [0.1, 2.0, 22.0])
+                    return processor
+                elapsed, processor = best_time(run)
+                total[scale] += elapsed
+                masks[scale] = (processor.paper_mask, processor.spot_mask)
+            paper, spots = masks[1]
+            for scale in scales:
+                paper_diff = np.count_nonzero(masks[scale][0] != paper) / max(np.count_nonzero(paper), 1)
+                spot_diff = np.count_nonzero(masks[scale][1] != spots) / max(np.count_nonzero(spots), 1)
+                worst[scale] = (max(worst[scale][0], paper_diff), max(worst[scale][1], spot_diff))
+        for scale in scales:
+            print(f"    1/{scale}: total {total[scale]:.2f} s, worst paper difference {worst[scale][0]*100:.4f}%, "
+                  f"worst spot difference {worst[scale][1]*100:.4f}%")
+
+    def quadtree(self):
+        '''
+        Number of tiles thresholded with the fixed grid of paper tiles and with the quadtree
+        candidates, the number of quadtree tiles tested, and the time of the tile by tile
+        engine, which thresholds each candidate on its own.
+        '''
+        grid_total = 0
+        candidate_total = 0
+        tested_total = 0
+        tile_time = 0.0
+        for filename in self.image_files:
+            processor = self.open_processor(filename)
+            if processor is None:
+                continue
+            rect = processor.paper_crop
+            x, y, w, h = rect
+            params = processor.spot_params(0, 25, 10)
+            _, paper_max = ts.tile_min_max(processor.paper_mask[y:y+h, x:x+w], processor.win_size)
+            candidates, tested = core.spot_candidates(processor.paper, rect, params)
+            elapsed, _ = best_time(lambda: core.tile_spot_mask(processor.paper, rect, params))
+            grid_total += np.count_nonzero(paper_max)
+            candidate_total += np.count_nonzero(candidates)
+            tested_total += tested
+            tile_time += elapsed
+            print(f"    {os.path.basename(filename)}: {np.count_nonzero(paper_max)} paper tiles, "
+                  f"{np.count_nonzero(candidates)} candidates, {tested} tested, tile engine {elapsed*1000:.1f} ms")
+        if grid_total > 0:
+            print(f"    total: {grid_total} paper tiles, {candidate_total} candidates "
+                  f"({grid_total/max(candidate_total, 1):.1f}x fewer), {tested_total} tested, tile engine {tile_time:.2f} s")
+
+
+    def local_threshold(self):
+        '''
+        Time of the integral image Niblack and Sauvola engines against the tiled engines, and
+        their agreement with the tiled spot mask: the Dice coefficient, and the spot pixel
+        count as a fraction of the tiled count.
+        '''
+        engines = ["tile", "block", "niblack", "sauvola"]
+        total = {engine: 0.0 for engine in engines}
+        dice_total = {engine: 0.0 for engine in engines[2:]}
+        count = 0
+        for filename in self.image_files:
+            processor = self.open_processor(filename)
+            if processor is None:
+                continue
+            rect = processor.paper_crop
+            masks = {}
+            times = {}
+            for engine in engines:
+                processor.spot_engine = engine
+                params = processor.spot_params(0, 25, 10)
+                if engine == "tile":
+                    func = core.tile_spot_mask
+                elif engine == "block":
+                    func = core.block_spot_mask
+                else:
+                    func = core.local_spot_mask
+                times[engine], mask = best_time(lambda: func(processor.paper, rect, params))
+                masks[engine] = mask > 0
+                total[engine] += times[engine]
+            count += 1
+            reference = masks["tile"]
+            ref_pixels = max(np.count_nonzero(reference), 1)
+            line = f"    {os.path.basename(filename)}: tile {times['tile']*1000:.1f} ms, block {times['block']*1000:.1f} ms"
+            for engine in engines[2:]:
+                pixels = np.count_nonzero(masks[engine])
+                dice = 2.0*np.count_nonzero(masks[engine] & reference) / max(pixels + np.count_nonzero(reference), 1)
+                dice_total[engine] += dice
+                line += f", {engine} {times[engine]*1000:.1f} ms dice {dice:.3f} pixels {pixels/ref_pixels:.2f}x"
+            print(line)
+        if count > 0:
+            line = f"    total: tile {total['tile']:.2f} s, block {total['block']:.2f} s"
+            for engine in engines[2:]:
+                line += f", {engine} {total[engine]:.2f} s mean dice {dice_total[engine]/count:.3f}"
+            print(line)
+
+
+    def analysis_resolution(self):
+        '''
+        End-to-end time and results with the images reduced to several analysis resolutions,
+        with the Whatman calibration and the 0.1/2/22 uL size thresholds of the validation data.
+        The total volume and count of the spots and the paper area are compared with full
+        resolution, and with the paper area and the median of the users' total volumes in
+        Validation/VSAValidationData.csv.  The tiles are kept at the same size in cm.
+        '''
+        with open(CALIBRATION_FILE) as file:
+            calibration = json.load(file)
+        pix_per_cm = calibration['pixels_per_cm']
+        volume_mapper = AreaVolumeMap()
+        volume_mapper.compute_model(calibration['volume_calibration_data'])
+        user_volumes = {}
+        user_papers = {}
+        with open(VALIDATION_DATA) as file:
+            for record in csv.DictReader(file):
+                user_papers[record['sample_id'].strip() + ".tif"] = float(record['paper_areaAB'])
+                volumes = []
+                for key in ['AB.total_volume_ul', 'total_volume_ulKK', 'total_volume_ulLMM2.x']:
+                    try:
+                        volumes.append(float(record[key]))
+                    except ValueError:
+                        pass
+                if volumes:
+                    user_volumes[record['sample_id'].strip() + ".tif"] = float(np.median(volumes))
+
+        targets = [None, 40.0, 30.0, 20.0]
+        results = {target: [] for target in targets}
+        for filename in self.image_files:
+            for target in targets:
+                def run():
+                    processor = VsaProcessor()
+                    processor.analysis_pix_per_cm = target
+                    processor.tile_size_cm = 100 / pix_per_cm
+                    processor.open_image(filename, pix_per_cm)
+                    processor.segment_paper(processor.get_default_paper_threshold())
+                    processor.segment_spots(0, 25, 10, pix_per_cm)
+                    processor.measure_spots(volume_mapper, pix_per_cm, [0.1, 2.0, 22.0])
+                    return processor
+                elapsed, processor = best_time(run)
+                totals = processor.spot_table.class_totals()
+                name = os.path.basename(filename)
+                results[target].append((elapsed, totals['volume_ul'][1:].sum(), totals['count'][1:].sum(),
+                                        processor.get_paper_area(), user_volumes.get(name), user_papers.get(name)))
+        full = results[None]
+        for target in targets:
+            elapsed = sum(result[0] for result in results[target])
+            volume_diff = [abs(result[1] - base[1]) / max(base[1], 1.0) for result, base in zip(results[target], full)]
+            count_diff = sum(result[2] != base[2] for result, base in zip(results[target], full))
+            paper_diff = [abs(result[3] - base[3]) / base[3] for result, base in zip(results[target], full)]
+            user_diff = [abs(result[1] - result[4]) for result in results[target] if result[4] is not None]
+            user_paper_diff = [abs(result[3] - result[5]) / result[5] for result in results[target] if result[5] is not None]
+            name = "full resolution" if target is None else f"{target:.0f} px/cm"
+            print(f"    {name}: total {elapsed:.2f} s, volume vs full mean {np.mean(volume_diff)*100:.2f}% "
+                  f"worst {np.max(volume_diff)*100:.2f}%, spot count changed on {count_diff} of {len(full)}, "
+                  f"paper area worst {np.max(paper_diff)*100:.3f}%")
+            print(f"        vs users: paper area mean {np.mean(user_paper_diff)*100:.3f}%, "
+                  f"total volume mean absolute difference {np.mean(user_diff):.1f} uL")
+
+
+    def paper(self):
+        '''
+        Time of segment_paper() at full resolution and with the paper found on 1/4 and 1/8
+        images, and the fraction of the paper pixels that differ from full resolution.  The
+        first image is also scaled up to 6000 x 4500 to show the cost on a full size scan.
+        '''
+        images = []
+        for filename in self.image_files:
+            processor = VsaProcessor()
+            if processor.open_image(filename):
+                images.append((os.path.basename(filename), processor.img))
+        if images:
+            name, img = images[0]
+            images.append((f"{name} at 6000x4500", cv2.resize(img, (6000, 4500), interpolation=cv2.INTER_LINEAR)))
+
+        scales = [1, 4, 8]
+        total = {scale: 0.0 for scale in scales}
+        worst = {scale: 0.0 for scale in scales}
+        for name, img in images:
+            processor = VsaProcessor()
+            processor.img = img
+            threshold = processor.get_default_paper_threshold()
+            masks = {}
+            times = {}
+            for scale in scales:
+                processor.pyramid_scale = scale
+                times[scale], _ = best_time(lambda: processor.segment_paper(threshold), repeat=5)
+                masks[scale] = processor.paper_mask
+            paper = masks[1]
+            for scale in scales:
+                worst[scale] = max(worst[scale], np.count_nonzero(masks[scale] != paper) / max(np.count_nonzero(paper), 1))
+            if img is images[-1][1]:
+                print(f"    {name}: " + ", ".join(f"1/{scale} {times[scale]*1000:.1f} ms" for scale in scales))
+            else:
+                for scale in scales:
+                    total[scale] += times[scale]
+        print("    Validation total: " + ", ".join(f"1/{scale} {total[scale]*1000:.0f} ms" for scale in scales))
+        print("    worst paper difference: " + ", ".join(f"1/{scale} {worst[scale]*100:.4f}%" for scale in scales))
+
+
+    def threads(self):
+        '''
+        Scaling of the "tile" spot engine over 1 to cpu_count threads, for the Validation
+        images and for each one upscaled 2x, where there are four times as many tiles.  Every
+        mask is checked against the single thread mask, which must be identical.
+        '''
+        cpu_count = os.cpu_count() or 1
+        thread_counts = sorted({1, 2, 4, cpu_count})
+        print(f"    {cpu_count} cpus")
+        for upscale in [1, 2]:
+            total = {threads: 0.0 for threads in thread_counts}
+            mismatched = 0
+            for filename in self.image_files:
+                processor = self.open_processor(filename)
+                if processor is None:
+                    continue
+                if upscale > 1:
+                    # a new processor, the paper cache of the first one holds the paper of the file
+                    img = cv2.resize(processor.img, None, fx=upscale, fy=upscale, interpolation=cv2.INTER_LINEAR)
+                    processor = VsaProcessor()
+                    processor.set_image(img, filename)
+                    processor.segment_paper(processor.get_default_paper_threshold())
+                rect = processor.paper_crop
+                reference = None
+                for threads in thread_counts:
+                    processor.spot_threads = threads
+                    params = processor.spot_params(0, 25, 10)
+                    elapsed, mask = best_time(lambda: core.tile_spot_mask(processor.paper, rect, params))
+                    total[threads] += elapsed
+                    if reference is None:
+                        reference = mask
+                    elif not np.array_equal(mask, reference):
+                        mismatched += 1
+            base = max(total[1], 1e-9)
+            print(f"    {upscale}x images: " + ", ".join(f"{threads} threads {total[threads]:.2f} s ({base/max(total[threads], 1e-9):.2f}x)" for threads in thread_counts) + f", masks different from 1 thread: {mismatched}")
+
+
+def main():
+    bench_class = BenchVsa()
+    if len(sys.argv) <= 1:
+        bench_class.run_all()
+    else:
+        for bench_name in sys.argv[1:]:
+            bench_class.run_bench(bench_name)
+    return
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+# Spoti-find - Copyright (C) 2025 The Jackson Laboratory, Inc.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+
+from collections import OrderedDict
+import numpy as np
+
+
+def result_nbytes(value):
+    '''
+    Estimates the memory held by a cached result: the sum of the sizes of the NumPy
+    arrays in a value that is an array, or a tuple or dictionary of them.  Lists are
+    taken to be plain Python data, such as polygons, and are not walked, since a
+    polygon of many points would take longer to walk than to compute.
+    '''
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sum(result_nbytes(item) for item in value.values())
+    if isinstance(value, tuple):
+        return sum(result_nbytes(item) for item in value)
+    return 0
+
+
+class LruCache():
+    '''
+    Least recently used cache of results that are expensive to compute, bounded by the
+    total size of the arrays they hold (see result_nbytes).  The number of lookups that
+    found a result, hits, and that did not, misses, are counted.
+
+    The cached arrays are shared with the callers, so they are made read-only.
+    '''
+    def __init__(self, max_bytes=256*2**20):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()    # key -> (value, nbytes), least recently used first
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        return
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        '''
+        Returns the value cached for key, or None if there is none.
+        '''
+        if key not in self.entries:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return self.entries[key][0]
+
+    def put(self, key, value):
+        '''
+        Caches value under key, dropping the least recently used entries to stay within
+        max_bytes.  A value larger than max_bytes is not cached.
+        '''
+        nbytes = result_nbytes(value)
+        if key in self.entries:
+            self.nbytes -= self.entries.pop(key)[1]
+        if nbytes > self.max_bytes:
+            return
+        _set_read_only(value)
+        self.entries[key] = (value, nbytes)
+        self.nbytes += nbytes
+        while self.nbytes > self.max_bytes:
+            _, (_, dropped) = self.entries.popitem(last=False)
+            self.nbytes -= dropped
+        return
+
+    def clear(self):
+        self.entries.clear()
+        self.nbytes = 0
+        return
+
+
+def _set_read_only(value):
+    if isinstance(value, np.ndarray):
+        value.setflags(write=False)
+    elif isinstance(value, dict):
+        for item in value.values():
+            _set_read_only(item)
+    elif isinstance(value, tuple):
+        for item in value:
+            _set_read_only(item)
@@ -0,0 +1,164 @@
+# Spoti-find - Copyright (C) 2025 The Jackson Laboratory, Inc.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+
+"""
+Copyright The Jackson Laboratory, 2025
+
+The Pipeline class runs items through a sequence of stages, each on its own
+threads, with a bounded queue in front of every stage.  A stage that falls
+behind fills its queue and blocks the stages before it, so no more than the
+queue sizes are held in memory, and every stage counts the time it is busy,
+waiting for input and blocked by the stage after it.
+"""
+import time
+import queue
+import threading
+
+# Marks the end of the items in a queue
+_STOP = object()
+
+
+class PipelineStage():
+    '''
+    One stage of a Pipeline: func is applied to each item by workers threads, which take
+    the items from a queue of queue_size items.  func returns the item passed to the next
+    stage, or None to pass nothing on.
+    '''
+    def __init__(self, name, func, workers=1, queue_size=2):
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.queue_size = queue_size
+        self.lock = threading.Lock()
+        self.items = 0              # items processed
+        self.busy = 0.0             # seconds in func, over all workers
+        self.starved = 0.0          # seconds waiting for an item, over all workers
+        self.blocked = 0.0          # seconds waiting for room in the next queue, over all workers
+        self.queued = 0             # sum of the input queue lengths seen as items were taken
+        return
+
+    def occupancy(self, elapsed):
+        '''
+        Returns the fractions of the time of the workers over elapsed seconds that they
+        were busy, waiting for input and blocked by the next stage, and the mean fill of
+        the input queue as items were taken.
+        '''
+        total = max(self.workers * elapsed, 1e-9)
+        fill = self.queued / (self.items * self.queue_size) if self.items > 0 else 0.0
+        return self.busy / total, self.starved / total, self.blocked / total, fill
+
+    def report(self, elapsed):
+        ''' Returns a line of the metrics of the stage over elapsed seconds. '''
+        busy, starved, blocked, fill = self.occupancy(elapsed)
+        return (f"{self.name}: {self.items} items on {self.workers} thread(s), busy {busy*100:.0f}%, "
+                f"waiting for input {starved*100:.0f}%, blocked {blocked*100:.0f}%, queue {fill*100:.0f}% full")
+
+
+class Pipeline():
+    '''
+    Runs items through the PipelineStages in order.  The items leave the stages with more
+    than one worker in the order they finish.  An exception raised by a stage stops the
+    pipeline: the items in flight are dropped, and run() raises the exception.
+    '''
+    def __init__(self, stages):
+        self.stages = stages
+        self.elapsed = 0.0
+        return
+
+    def run(self, items, on_result=None):
+        '''
+        Feeds the items to the first stage, waiting whenever its queue is full, and calls
+        on_result, on this thread, with each item passed on by the last stage.  Returns the
+        number of items passed on by the last stage.  An exception raised by on_result
+        also stops the pipeline.
+        '''
+        queues = [queue.Queue(stage.queue_size) for stage in self.stages] + [queue.Queue()]
+        failure = []
+        threads = []
+        for idx, stage in enumerate(self.stages):
+            remaining = [stage.workers]
+            for _ in range(stage.workers):
+                thread = threading.Thread(target=self._work, args=(stage, queues[idx], queues[idx+1], remaining, failure),
+                                          name=f"{stage.name} worker", daemon=True)
+                threads.append(thread)
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+
+        def feed():
+            for item in items:
+                if failure:
+                    break
+                queues[0].put(item)
+            queues[0].put(_STOP)
+        feeder = threading.Thread(target=feed, name="pipeline feeder", daemon=True)
+        feeder.start()
+
+        count = 0
+        while True:
+            item = queues[-1].get()
+            if item is _STOP:
+                break
+            count += 1
+            if (on_result is not None) and not failure:
+                try:
+                    on_result(item)
+                except Exception as error:
+                    failure.append(error)
+        feeder.join()
+        for thread in threads:
+            thread.join()
+        self.elapsed = time.perf_counter() - start
+        if failure:
+            raise failure[0]
+        return count
+
+    def _work(self, stage, in_queue, out_queue, remaining, failure):
+        '''
+        A worker of stage.  After a failure, items are still taken and dropped, so that
+        no stage stays blocked.  The last worker of the stage to finish passes the end
+        of the items on to the next stage.
+        '''
+        while True:
+            start = time.perf_counter()
+            queued = in_queue.qsize()
+            item = in_queue.get()
+            got = time.perf_counter()
+            if item is _STOP:
+                # Left for the other workers of the stage
+                in_queue.put(_STOP)
+                break
+            result = None
+            if not failure:
+                try:
+                    result = stage.func(item)
+                except Exception as error:
+                    failure.append(error)
+            done = time.perf_counter()
+            if (result is not None) and not failure:
+                out_queue.put(result)
+            with stage.lock:
+                stage.items += 1
+                stage.queued += queued
+                stage.starved += got - start
+                stage.busy += done - got
+                stage.blocked += time.perf_counter() - done
+        with stage.lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last:
+            out_queue.put(_STOP)
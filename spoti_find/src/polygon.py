@@ -0,0 +1,292 @@
+# Spoti-find - Copyright (C) 2025 The Jackson Laboratory, Inc.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+
+"""
+Copyright The Jackson Laboratory, 2025
+
+The Polygon class holds the vertices of a closed polygon in a NumPy array, and
+computes its measurements once, when they are first needed.  The functions in
+polygon_tools are wrappers around this class.
+"""
+import math
+import numpy as np
+
+
+class Polygon():
+    '''
+    Closed polygon with its vertices in an (N, 2) array, an int32 array for pixel
+    coordinates.  Polygons given with floating point coordinates keep them as float64,
+    so that the measurements are not changed by rounding.
+
+    The measurements follow polygon_tools: the signed area is positive for clockwise
+    polygons in image coordinates, and the bounding box (x, y, w, h) includes both
+    end pixels.
+    '''
+    __slots__ = ('points', '_signed_area', '_perimeter', '_bbox', '_centroid')
+
+    def __init__(self, points):
+        points = np.asarray(points)
+        if points.size == 0:
+            points = np.zeros((0, 2), dtype=np.int32)
+        elif np.issubdtype(points.dtype, np.integer):
+            points = points.astype(np.int32, copy=False)
+        else:
+            points = points.astype(np.float64, copy=False)
+        self.points = points.reshape(-1, 2)
+        self._signed_area = None
+        self._perimeter = None
+        self._bbox = None
+        self._centroid = None
+
+    @classmethod
+    def from_contour(cls, contour):
+        ''' Creates a polygon from a contour as returned by OpenCV's findContours. '''
+        return cls(contour.reshape(-1, 2))
+
+    def __len__(self):
+        return len(self.points)
+
+    def to_contour(self):
+        ''' Returns the vertices as an OpenCV contour, an (N, 1, 2) int32 array. '''
+        return self.points.astype(np.int32, copy=False).reshape(-1, 1, 2)
+
+    def to_list(self):
+        ''' Returns the vertices as a list of [x, y] lists. '''
+        return self.points.tolist()
+
+    def _coords(self):
+        ''' Returns the x and y coordinates, as int64 for pixel coordinates so that products cannot overflow. '''
+        if self.points.dtype == np.int32:
+            points = self.points.astype(np.int64)
+        else:
+            points = self.points
+        return points[:, 0], points[:, 1]
+
+    @property
+    def signed_area(self):
+        if self._signed_area is None:
+            if len(self.points) < 3:
+                self._signed_area = 0.0
+            else:
+                x, y = self._coords()
+                cross = np.dot(y[:-1], x[1:]) - np.dot(x[:-1], y[1:]) + (y[-1]*x[0] - x[-1]*y[0])
+                self._signed_area = float(cross) / 2.0
+        return self._signed_area
+
+    @property
+    def area(self):
+        return abs(self.signed_area)
+
+    @property
+    def perimeter(self):
+        if self._perimeter is None:
+            if len(self.points) == 0:
+                self._perimeter = 0.0
+            else:
+                x, y = self._coords()
+                dx = np.diff(x, append=x[:1])
+                dy = np.diff(y, append=y[:1])
+                self._perimeter = float(np.sqrt(dx*dx + dy*dy).sum())
+        return self._perimeter
+
+    @property
+    def bbox(self):
+        if self._bbox is None:
+            x = self.points[:, 0]
+            y = self.points[:, 1]
+            x1, y1 = x.min().item(), y.min().item()
+            self._bbox = (x1, y1, x.max().item() - x1 + 1, y.max().item() - y1 + 1)
+        return self._bbox
+
+    @property
+    def vertex_mean(self):
+        '''
+        The average of the vertices.  This approximates the centroid for polygons with
+        many short sides, such as contours.
+        '''
+        x, y = self.points.mean(axis=0).tolist()
+        return (x, y)
+
+    @property
+    def centroid(self):
+        '''
+        The center of mass of the polygon's area.  Polygons without area use the
+        average of their vertices.
+        '''
+        if self._centroid is None:
+            if self.signed_area == 0.0:
+                self._centroid = self.vertex_mean
+            else:
+                x, y = self._coords()
+                x_next = np.roll(x, -1)
+                y_next = np.roll(y, -1)
+                cross = x*y_next - x_next*y
+                scale = 1.0 / (6.0 * float(cross.sum()) / 2.0)
+                self._centroid = (float(((x + x_next)*cross).sum())*scale,
+                                  float(((y + y_next)*cross).sum())*scale)
+        return self._centroid
+
+    @property
+    def circularity(self):
+        L = self.perimeter
+        if L <= 0.0:
+            return 0.0
+        return (4.0*math.pi*self.area)/(L*L)
+
+
+class PolygonSet():
+    '''
+    Set of polygons stored as one (M, 2) int32 array of all of their vertices, coords,
+    and the index in coords of the first vertex of each polygon, offsets, which ends
+    with M.  Polygon i is coords[offsets[i]:offsets[i+1]], and indexing the set returns
+    that slice as a view, so the polygons and their OpenCV contours are not copied.
+
+    The measurements of all the polygons are computed together, with the same values
+    as the Polygon measurements.
+    '''
+    __slots__ = ('coords', 'offsets')
+
+    def __init__(self, coords=None, offsets=None):
+        if coords is None:
+            coords = np.zeros((0, 2), dtype=np.int32)
+            offsets = np.zeros(1, dtype=np.int64)
+        self.coords = np.ascontiguousarray(coords, dtype=np.int32).reshape(-1, 2)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+
+    @classmethod
+    def _from_arrays(cls, arrays):
+        if len(arrays) == 0:
+            return cls()
+        lengths = np.fromiter((len(array) for array in arrays), dtype=np.int64, count=len(arrays))
+        offsets = np.zeros(len(arrays)+1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        return cls(np.concatenate(arrays).reshape(-1, 2), offsets)
+
+    @classmethod
+    def from_contours(cls, contours):
+        ''' Creates a set from a list of contours, as returned by OpenCV's findContours. '''
+        return cls._from_arrays([contour.reshape(-1, 2) for contour in contours])
+
+    @classmethod
+    def from_polygons(cls, polygons):
+        ''' Creates a set from a list of polygons, each a list of [x, y] points or an (N, 2) array. '''
+        return cls._from_arrays([np.asarray(polygon, dtype=np.int32).reshape(-1, 2) for polygon in polygons])
+
+    @classmethod
+    def concatenate(cls, polygon_sets):
+        ''' Creates a set holding the polygons of each of the given sets, in order. '''
+        polygon_sets = [polygon_set for polygon_set in polygon_sets if len(polygon_set) > 0]
+        if len(polygon_sets) == 0:
+            return cls()
+        coords = np.concatenate([polygon_set.coords for polygon_set in polygon_sets])
+        ends = np.cumsum([0] + [len(polygon_set.coords) for polygon_set in polygon_sets])
+        offsets = [polygon_set.offsets[:-1] + end for polygon_set, end in zip(polygon_sets, ends)]
+        return cls(coords, np.concatenate(offsets + [ends[-1:]]))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, idx):
+        return self.coords[self.offsets[idx]:self.offsets[idx+1]]
+
+    def __iter__(self):
+        bounds = self.offsets.tolist()
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            yield self.coords[start:stop]
+
+    def lengths(self):
+        ''' Returns the number of vertices of each polygon. '''
+        return np.diff(self.offsets)
+
+    def polygon(self, idx):
+        ''' Returns polygon idx as a Polygon, sharing the coordinates of the set. '''
+        return Polygon(self[idx])
+
+    def contour(self, idx):
+        ''' Returns polygon idx as an OpenCV contour, sharing the coordinates of the set. '''
+        return self[idx].reshape(-1, 1, 2)
+
+    def to_contours(self):
+        ''' Returns all of the polygons as OpenCV contours, sharing the coordinates of the set. '''
+        return [points.reshape(-1, 1, 2) for points in self]
+
+    def to_lists(self):
+        ''' Returns all of the polygons as lists of [x, y] lists. '''
+        coords = self.coords.tolist()
+        bounds = self.offsets.tolist()
+        return [coords[start:stop] for start, stop in zip(bounds[:-1], bounds[1:])]
+
+    def take(self, indices):
+        ''' Returns a new set of the polygons at the given indices, in that order. '''
+        indices = np.asarray(indices, dtype=np.intp).reshape(-1)
+        starts = self.offsets[indices]
+        lengths = self.offsets[indices+1] - starts
+        offsets = np.zeros(len(indices)+1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        point_idx = np.repeat(starts - offsets[:-1], lengths) + np.arange(offsets[-1])
+        return PolygonSet(self.coords[point_idx], offsets)
+
+    def _reduce(self, ufunc, values, empty_value):
+        '''
+        Applies ufunc.reduceat to the per-vertex values of each polygon, with empty_value
+        for polygons without vertices.
+        '''
+        lengths = self.lengths()
+        result = np.full((len(lengths),) + values.shape[1:], empty_value, dtype=values.dtype)
+        filled = lengths > 0
+        if np.any(filled):
+            result[filled] = ufunc.reduceat(values, self.offsets[:-1][filled], axis=0)
+        return result
+
+    def _following(self):
+        ''' Returns, for every vertex, the index of the vertex that follows it around its polygon. '''
+        following = np.arange(1, len(self.coords)+1, dtype=np.intp)
+        lengths = self.lengths()
+        filled = lengths > 0
+        following[self.offsets[1:][filled] - 1] = self.offsets[:-1][filled]
+        return following
+
+    def signed_areas(self):
+        ''' Returns the signed area of each polygon, positive for clockwise polygons. '''
+        if len(self) == 0:
+            return np.zeros(0)
+        points = self.coords.astype(np.int64)
+        following = self._following()
+        cross = points[:, 1]*points[following, 0] - points[:, 0]*points[following, 1]
+        return self._reduce(np.add, cross, 0) / 2.0
+
+    def areas(self):
+        ''' Returns the unsigned area of each polygon. '''
+        return np.abs(self.signed_areas())
+
+    def perimeters(self):
+        ''' Returns the perimeter length of each polygon. '''
+        if len(self) == 0:
+            return np.zeros(0)
+        points = self.coords.astype(np.int64)
+        d = points[self._following()] - points
+        return self._reduce(np.add, np.sqrt((d*d).sum(axis=1)), 0.0)
+
+    def bboxes(self):
+        ''' Returns the minimum bounding rectangle, (x, y, w, h), of each polygon, as an (n, 4) array. '''
+        if len(self) == 0:
+            return np.zeros((0, 4), dtype=np.int64)
+        points = self.coords.astype(np.int64)
+        low = self._reduce(np.minimum, points, 0)
+        high = self._reduce(np.maximum, points, -1)
+        return np.hstack([low, high - low + 1])
+
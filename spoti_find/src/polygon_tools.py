@@ -19,8 +19,9 @@
 Copyright The Jackson Laboratory, 2023
 authors: Jim Peterson
 """
-import math
 import numpy as np
+import cv2
+from .polygon import Polygon
 
 
 def contour_to_polygon(contour):
@@ -28,10 +29,7 @@ def contour_to_polygon(contour):
     Converts a contour (numpy array), as would be produced by OpenCVs findContours function, to
     a simple list of points.
     """
-    polygon = []
-    for obj in contour.tolist():
-        polygon.append(obj[0])
-    return polygon
+    return contour.reshape(-1, 2).tolist()
 
 def polygon_to_contour(polygon):
     """
@@ -41,60 +39,49 @@ def polygon_to_contour(polygon):
     contour = np.array([[p] for p in polygon]).astype(np.int32)
     return contour
 
+def _as_polygon(pt_list):
+    """
+    Returns pt_list as a Polygon, so that the functions below accept a Polygon, an array
+    of points or a list of points, and all of them are measured by Polygon.
+    """
+    if isinstance(pt_list, Polygon):
+        return pt_list
+    return Polygon(pt_list)
+
 def polygon_perimeter(pt_list):
     """
     Compute the polygon perimeter length.
     """
-    sum = 0.0
-    for idx in range(len(pt_list)-1):
-        dx = pt_list[idx+1][0] - pt_list[idx][0]
-        dy = pt_list[idx+1][1] - pt_list[idx][1]
-        sum += math.sqrt(dx*dx + dy*dy)
-
-    dx = pt_list[0][0] - pt_list[-1][0]
-    dy = pt_list[0][1] - pt_list[-1][1]
-    sum += math.sqrt(dx*dx + dy*dy)
-    return sum
+    return _as_polygon(pt_list).perimeter
 
 def polygon_center(pt_list):
     """
     This computes the weighted average of the vertices.
     Note: This is NOT the center of weight of the polygon, but does
     a good job of approximating it for polygons with many short sides.
+    See Polygon.centroid for the center of weight.
     """
-    if not pt_list:
+    if len(pt_list) == 0:
         return None
-    x = sum([p[0] for p in pt_list])/len(pt_list)
-    y = sum([p[1] for p in pt_list])/len(pt_list)
-    return (x, y)
+    return _as_polygon(pt_list).vertex_mean
 
 def polygon_signed_area(pt_list) -> float:
     """
     Compute signed polygon area.  Clockwise - positive.
     Note: self-intersections create holes.
     """
-    if (pt_list is None) or (len(pt_list) < 3):
+    if pt_list is None:
         return 0.0
-    sum = 0.0
-    vertex_count = len(pt_list) - 1
-    for idx in range(len(pt_list)-1):
-        sum += (pt_list[idx][1]*pt_list[idx+1][0] - pt_list[idx][0]*pt_list[idx+1][1]);
-
-    if (pt_list[0][0] != pt_list[-1][0]) or (pt_list[0][1] != pt_list[-1][1]):
-        sum += (pt_list[-1][1]*pt_list[0][0] - pt_list[-1][0]*pt_list[0][1]);
-
-    sum /= 2.0;
-    return sum
+    return _as_polygon(pt_list).signed_area
 
 
 def polygon_area(pt_list):
     """
     Computes the unsigned area of a polygon
     """
-    area = polygon_signed_area(pt_list)
-    if area < 0.0:
-        area *= -1.0
-    return area
+    if pt_list is None:
+        return 0.0
+    return _as_polygon(pt_list).area
 
 def point_in_polygon_mbr(pt, polygon):
     mbr = polygon_mbr(polygon)
@@ -109,13 +96,7 @@ def point_in_polygon_mbr(pt, polygon):
     return True
 
 def polygon_mbr(polygon):
-    x_coords = [pt[0] for pt in polygon]
-    y_coords = [pt[1] for pt in polygon]
-    x = min(x_coords)
-    w = max(x_coords) - x + 1
-    y = min(y_coords)
-    h = max(y_coords) - y +1
-    return (x, y, w, h)
+    return _as_polygon(polygon).bbox
 
 def largest_contour(contours):
     '''
@@ -124,12 +105,10 @@ def largest_contour(contours):
     '''
     if contours is None:
         return -1
-
-    polygons = []
-    for contour in contours:
-        polygon = contour_to_polygon(contour)
-        polygons.append(polygon)
-    return largest_polygon(polygons)
+    if len(contours) <= 0:
+        return -1
+    # argmax returns the first of equal areas, and 0 when no contour has any area
+    return int(np.argmax([cv2.contourArea(contour) for contour in contours]))
 
 
 
@@ -139,26 +118,15 @@ def largest_polygon(polygons):
     '''
     if (polygons is None) or (len(polygons) <= 0):
         return -1
-    max_area = 0.0
-    max_idx = 0
-    for idx in range(len(polygons)):
-        area = polygon_area(polygons[idx])
-        if area > max_area:
-            max_area = area
-            max_idx = idx
-    return max_idx
+    areas = [polygon_area(polygon) for polygon in polygons]
+    return int(np.argmax(areas))
 
 
 def circularity(polygon):
     '''
     Computes the circularity of a given polygon
     '''
-    L = polygon_perimeter(polygon)
-    if L <= 0.0:
-        return 0.0
-    A = polygon_area(polygon)
-    C = (4.0*math.pi*A)/(L*L)
-    return C
+    return _as_polygon(polygon).circularity
 
 
 def smooth_polygon(polygon):
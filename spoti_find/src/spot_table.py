@@ -0,0 +1,121 @@
+# Spoti-find - Copyright (C) 2025 The Jackson Laboratory, Inc.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+
+"""
+Copyright The Jackson Laboratory, 2025
+
+The SpotTable class holds the measurements of all the spots of an image, one
+NumPy array per measurement.  The per-class totals used for the summaries are
+computed with np.bincount over the class code column.
+"""
+import numpy as np
+
+# Spot classes by volume, smallest first, as split by the three size thresholds.
+# The class code of a spot is its index in this list.
+SPOT_CLASSES = ['junk', 'nano', 'micro', 'primary']
+JUNK, NANO, MICRO, PRIMARY = range(len(SPOT_CLASSES))
+
+
+class SpotTable():
+    '''
+    Measurements of the spots, as columns of equal length in order of decreasing volume.
+    The columns are those of the spot property dictionaries, with 'class_code' in place of
+    'class', and the spot polygons are held in points, a PolygonSet, in the pixels of the
+    image file like the img_* columns (see vsa_core.scale_spots).
+
+    Indexing the table with a column name returns the column.  Indexing it with a row
+    number, or iterating over it, gives the spot property dictionaries, so the table can
+    be used where a list of them was.
+    '''
+    def __init__(self, columns=None, points=None):
+        self.columns = {} if columns is None else columns
+        self.points = points
+        if 'class_code' not in self.columns:
+            self.columns['class_code'] = np.zeros(len(self), dtype=np.intp)
+        return
+
+    def __len__(self):
+        if len(self.columns) == 0:
+            return 0
+        return len(next(iter(self.columns.values())))
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self.columns[key]
+        return self.row(key)
+
+    def __iter__(self):
+        lists = {key: column.tolist() for key, column in self.columns.items() if key != 'class_code'}
+        class_code = self.columns['class_code'].tolist()
+        for idx in range(len(self)):
+            row = {key: values[idx] for key, values in lists.items()}
+            row['class'] = SPOT_CLASSES[class_code[idx]]
+            row['points'] = self.points[idx]
+            yield row
+
+    def row(self, idx):
+        ''' Returns the spot property dictionary of row idx. '''
+        row = {key: column[idx].item() for key, column in self.columns.items() if key != 'class_code'}
+        row['class'] = SPOT_CLASSES[int(self.columns['class_code'][idx])]
+        row['points'] = self.points[idx]
+        return row
+
+    def classify(self, size_thresh_list):
+        '''
+        Sets the class of every spot from its volume and the three size thresholds,
+        [junk/nano, nano/micro, micro/primary].  A spot is in the class of the number of
+        thresholds at or below its volume.  The running maximum keeps the thresholds
+        sorted, which matches testing them in order when they are not.
+        '''
+        bounds = np.maximum.accumulate(np.array(size_thresh_list, dtype=np.float64))
+        self.columns['class_code'] = np.searchsorted(bounds, self._column('volume_ul'), side='right')
+        return
+
+    def _column(self, key):
+        ''' Returns the column, or an empty one for a table that has not been filled in. '''
+        if key in self.columns:
+            return self.columns[key]
+        return np.zeros(len(self))
+
+    def class_totals(self):
+        '''
+        Returns the per-class totals of the spots, each an array indexed by class code:
+        'count', the sums of 'volume_ul', 'circularity', 'ave_dist_to_edge_cm' and 'area_cm2',
+        and 'area_dist', the sum of area_cm2*ave_dist_to_edge_cm.
+        '''
+        class_code = self.columns['class_code']
+        class_count = len(SPOT_CLASSES)
+        totals = {'count': np.bincount(class_code, minlength=class_count)}
+        for key in ['volume_ul', 'circularity', 'ave_dist_to_edge_cm', 'area_cm2']:
+            totals[key] = np.bincount(class_code, weights=self._column(key), minlength=class_count)
+        area_dist = self._column('area_cm2')*self._column('ave_dist_to_edge_cm')
+        totals['area_dist'] = np.bincount(class_code, weights=area_dist, minlength=class_count)
+        return totals
+
+    def class_means(self, totals=None):
+        '''
+        Returns the per-class means of 'volume_ul', 'circularity' and 'ave_dist_to_edge_cm',
+        each an array indexed by class code, with NaN for empty classes.
+        '''
+        if totals is None:
+            totals = self.class_totals()
+        means = {}
+        count = totals['count']
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for key in ['volume_ul', 'circularity', 'ave_dist_to_edge_cm']:
+                means[key] = np.where(count > 0, totals[key]/count, np.nan)
+        return means
@@ -0,0 +1,125 @@
+# Spoti-find - Copyright (C) 2025 The Jackson Laboratory, Inc.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+
+import os
+import sys
+import inspect
+import tempfile
+import threading
+import numpy as np
+import cv2
+from artifact_sink import ArtifactSink, DirectorySink, ThreadedSink
+
+class TestArtifactSink:
+    def __init__(self):
+        self.test_list = {
+            'directory_sink_001':self.directory_sink_001,
+            'threaded_sink_001':self.threaded_sink_001,
+            'threaded_sink_002':self.threaded_sink_002
+        }
+
+    def run_all(self):
+        for key in self.test_list:
+            print(f"{key}: ", end=" ")
+            self.test_list[key]()
+        return
+
+    def run_test(self, test_name):
+        print(f"{test_name}: ", end=" ")
+
+        if test_name not in self.test_list:
+            print("TEST NO FOUND")
+            return False
+        self.test_list[test_name]()
+        return True
+
+    def directory_sink_001(self):
+        frame = inspect.currentframe()
+        function_name = inspect.getframeinfo(frame).function
+        print(f"{function_name}:", end=" ")
+
+        img = np.arange(20*30, dtype=np.uint16).reshape(20, 30)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            ArtifactSink().write("none.tif", [img])
+            DirectorySink(tmp_dir).write("one.tif", [img])
+            DirectorySink(tmp_dir).write("two.tif", [img, img])
+            names = sorted(os.listdir(tmp_dir))
+            _, pages = cv2.imreadmulti(os.path.join(tmp_dir, "two.tif"), flags=cv2.IMREAD_UNCHANGED)
+        if names == ["one.tif", "two.tif"] and len(pages) == 2 and np.array_equal(pages[1], img):
+            print("Pass")
+        else:
+            print("FAIL")
+            print(f"    expected one.tif and a 2 page two.tif, saw {names} and {len(pages)} pages")
+
+    def threaded_sink_001(self):
+        frame = inspect.currentframe()
+        function_name = inspect.getframeinfo(frame).function
+        print(f"{function_name}:", end=" ")
+
+        img = np.zeros((20, 30), dtype=np.uint8)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            sink = ThreadedSink(DirectorySink(tmp_dir), max_pending=100)
+            for idx in range(10):
+                img[:] = idx
+                sink.write(f"img_{idx}.tif", [img])
+            sink.close()
+            values = [int(cv2.imread(os.path.join(tmp_dir, f"img_{idx}.tif"), cv2.IMREAD_GRAYSCALE)[0, 0]) for idx in range(10)]
+        if values == list(range(10)) and sink.dropped == 0 and sink.failed == 0:
+            print("Pass")
+        else:
+            print("FAIL")
+            print(f"    expected the values 0 to 9, saw {values}")
+
+    def threaded_sink_002(self):
+        frame = inspect.currentframe()
+        function_name = inspect.getframeinfo(frame).function
+        print(f"{function_name}:", end=" ")
+
+        # every artifact written from several threads at once is either dropped or failed
+        class FailingSink(ArtifactSink):
+            def write(self, name, images):
+                return False
+
+        img = np.zeros((4, 4), dtype=np.uint8)
+        sink = ThreadedSink(FailingSink(), max_pending=2)
+        def write_many():
+            for idx in range(2000):
+                sink.write(f"img_{idx}.tif", [img])
+        threads = [threading.Thread(target=write_many) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        sink.close()
+        if sink.dropped + sink.failed == 8*2000:
+            print("Pass")
+        else:
+            print("FAIL")
+            print(f"    expected {8*2000} dropped or failed, saw {sink.dropped} dropped and {sink.failed} failed")
+
+
+def main():
+    test_class = TestArtifactSink()
+    if len(sys.argv) <= 1:
+        test_class.run_all()
+    else:
+        for test_name in sys.argv[1:]:
+            test_class.run_test(test_name)
+    return
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+# Spoti-find - Copyright (C) 2025 The Jackson Laboratory, Inc.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+
+import sys
+import inspect
+import numpy as np
+from lru_cache import LruCache
+
+class TestLruCache:
+    def __init__(self):
+        self.test_list = {
+            'hits_misses_001':self.hits_misses_001,
+            'eviction_001':self.eviction_001
+        }
+
+    def run_all(self):
+        for key in self.test_list:
+            print(f"{key}: ", end=" ")
+            self.test_list[key]()
+        return
+
+    def run_test(self, test_name):
+        print(f"{test_name}: ", end=" ")
+
+        if test_name not in self.test_list:
+            print("TEST NO FOUND")
+            return False
+        self.test_list[test_name]()
+        return True
+
+    def hits_misses_001(self):
+        frame = inspect.currentframe()
+        function_name = inspect.getframeinfo(frame).function
+        print(f"{function_name}:", end=" ")
+
+        cache = LruCache()
+        value = {'mask': np.zeros((10, 10), dtype=np.uint8), 'polygon': [[0, 0], [9, 9]]}
+        missed = cache.get(('a', 1))
+        cache.put(('a', 1), value)
+        found = cache.get(('a', 1))
+        if (missed is None) and (found is value) and (cache.hits, cache.misses) == (1, 1) and not found['mask'].flags.writeable:
+            print("Pass")
+        else:
+            print("FAIL")
+            print(f"    expected 1 hit and 1 miss, saw {cache.hits} and {cache.misses}")
+
+    def eviction_001(self):
+        frame = inspect.currentframe()
+        function_name = inspect.getframeinfo(frame).function
+        print(f"{function_name}:", end=" ")
+
+        cache = LruCache(max_bytes=300)
+        for key in ['a', 'b', 'c']:
+            cache.put(key, np.zeros(100, dtype=np.uint8))
+        cache.get('a')
+        cache.put('d', np.zeros(100, dtype=np.uint8))
+        cache.put('e', np.zeros(1000, dtype=np.uint8))
+        keys = list(cache.entries.keys())
+        if keys == ['c', 'a', 'd'] and cache.nbytes == 300:
+            print("Pass")
+        else:
+            print("FAIL")
+            print(f"    expected ['c', 'a', 'd'] in 300 bytes, saw {keys} in {cache.nbytes} bytes")
+
+
+def main():
+    test_class = TestLruCache()
+    if len(sys.argv) <= 1:
+        test_class.run_all()
+    else:
+        for test_name in sys.argv[1:]:
+            test_class.run_test(test_name)
+    return
+
+if __name__ == '__main__':
+    main()
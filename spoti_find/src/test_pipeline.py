@@ -0,0 +1,132 @@
+# Spoti-find - Copyright (C) 2025 The Jackson Laboratory, Inc.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+
+import sys
+import time
+import inspect
+from pipeline import Pipeline, PipelineStage
+
+class TestPipeline:
+    def __init__(self):
+        self.test_list = {
+            'stages_001':self.stages_001,
+            'back_pressure_001':self.back_pressure_001,
+            'failure_001':self.failure_001
+        }
+
+    def run_all(self):
+        for key in self.test_list:
+            print(f"{key}: ", end=" ")
+            self.test_list[key]()
+        return
+
+    def run_test(self, test_name):
+        print(f"{test_name}: ", end=" ")
+
+        if test_name not in self.test_list:
+            print("TEST NO FOUND")
+            return False
+        self.test_list[test_name]()
+        return True
+
+    def stages_001(self):
+        frame = inspect.currentframe()
+        function_name = inspect.getframeinfo(frame).function
+        print(f"{function_name}:", end=" ")
+
+        # odd items are dropped by the second stage, which has several workers
+        stages = [PipelineStage("double", lambda x: 2*x),
+                  PipelineStage("odd", lambda x: x+1 if x % 4 == 0 else None, workers=3),
+                  PipelineStage("negate", lambda x: -x)]
+        results = []
+        count = Pipeline(stages).run(range(20), results.append)
+        expected = [-(2*x+1) for x in range(0, 20, 2)]
+        items = [stage.items for stage in stages]
+        if (sorted(results, reverse=True) == expected) and (count == 10) and (items == [20, 20, 10]):
+            print("Pass")
+        else:
+            print("FAIL")
+            print(f"    expected {expected} and items [20, 20, 10], saw {results} and {items}")
+
+    def back_pressure_001(self):
+        frame = inspect.currentframe()
+        function_name = inspect.getframeinfo(frame).function
+        print(f"{function_name}:", end=" ")
+
+        fed = [0]
+        finished = [0]
+        most = [0]
+
+        def items():
+            for idx in range(30):
+                fed[0] += 1
+                most[0] = max(most[0], fed[0] - finished[0])
+                yield idx
+
+        def slow(x):
+            time.sleep(0.002)
+            return x
+
+        def on_result(x):
+            finished[0] += 1
+
+        stages = [PipelineStage("fast", lambda x: x, queue_size=2), PipelineStage("slow", slow, queue_size=2)]
+        pipeline = Pipeline(stages)
+        pipeline.run(items(), on_result)
+        # two queues of 2, a worker per stage, the item being fed and one waiting for on_result
+        limit = 2 + 1 + 2 + 1 + 1 + 1
+        _, _, blocked, _ = stages[0].occupancy(pipeline.elapsed)
+        if (finished[0] == 30) and (most[0] <= limit) and (blocked > 0.0):
+            print("Pass")
+        else:
+            print("FAIL")
+            print(f"    expected 30 items, at most {limit} in flight, saw {finished[0]} and {most[0]}, blocked {blocked}")
+
+    def failure_001(self):
+        frame = inspect.currentframe()
+        function_name = inspect.getframeinfo(frame).function
+        print(f"{function_name}:", end=" ")
+
+        def check(x):
+            if x == 5:
+                raise ValueError("item 5")
+            return x
+
+        stages = [PipelineStage("check", check, workers=2), PipelineStage("copy", lambda x: x)]
+        try:
+            Pipeline(stages).run(range(100))
+            error = None
+        except ValueError as raised:
+            error = str(raised)
+        if error == "item 5":
+            print("Pass")
+        else:
+            print("FAIL")
+            print(f"    expected ValueError('item 5'), saw {error}")
+
+
+def main():
+    test_class = TestPipeline()
+    if len(sys.argv) <= 1:
+        test_class.run_all()
+    else:
+        for test_name in sys.argv[1:]:
+            test_class.run_test(test_name)
+    return
+
+if __name__ == '__main__':
+    main()
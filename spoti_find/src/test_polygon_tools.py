@@ -15,15 +15,29 @@
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
 
 
+import os
 import sys
 import inspect
-import polygon_tools as pt
+import json
+import math
+import tempfile
+import numpy as np
+
+# polygon_tools uses relative imports, so it is imported from the package
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from spoti_find.src import polygon_tools as pt
+from spoti_find.src import bench_vsa as bench
+from spoti_find.src.polygon import Polygon, PolygonSet
 
 class TestPolygonTools:
     def __init__(self):
         self.test_list = {
             'circularity_001':self.circularity_001,
-            'circularity_002':self.circularity_002
+            'circularity_002':self.circularity_002,
+            'polygon_centroid_001':self.polygon_centroid_001,
+            'polygon_set_001':self.polygon_set_001,
+            'list_measures_001':self.list_measures_001,
+            'polygon_set_json_001':self.polygon_set_json_001
         }
         self.epsilon = 0.0001
 
@@ -70,6 +84,112 @@ class TestPolygonTools:
             print(f"    expected 0.0, saw {circularity}")
 
 
+    def polygon_centroid_001(self):
+        frame = inspect.currentframe()
+        function_name = inspect.getframeinfo(frame).function
+        print(f"{function_name}:", end=" ")
+
+        # L-shaped polygon, a 4x2 rectangle and a 2x2 square, 12 units of area in all
+        polygon = Polygon([[0, 0], [4, 0], [4, 2], [2, 2], [2, 4], [0, 4]])
+        expected = (5.0/3.0, 5.0/3.0)
+        centroid = polygon.centroid
+        if abs(centroid[0] - expected[0]) < self.epsilon and abs(centroid[1] - expected[1]) < self.epsilon and polygon.area == 12.0:
+            print("Pass")
+        else:
+            print("FAIL")
+            print(f"    expected {expected} and area 12.0, saw {centroid} and area {polygon.area}")
+
+
+    def polygon_set_001(self):
+        frame = inspect.currentframe()
+        function_name = inspect.getframeinfo(frame).function
+        print(f"{function_name}:", end=" ")
+
+        polygons = [[[0, 0], [100, 0], [100, 100], [0, 100]],
+                    [[5, 5]],
+                    [[3, 1], [7, 2], [9, 8], [4, 6], [1, 4]]]
+        polygon_set = PolygonSet.from_polygons(polygons)
+        expected = [(pt.polygon_area(p), list(pt.polygon_mbr(p))) for p in polygons]
+        seen = list(zip(polygon_set.areas().tolist(), polygon_set.bboxes().tolist()))
+        perimeters_ok = np.allclose(polygon_set.perimeters(), [pt.polygon_perimeter(p) for p in polygons], rtol=1e-12)
+        subset = polygon_set.take([2, 0]).to_lists()
+        if seen == expected and perimeters_ok and subset == [polygons[2], polygons[0]] and np.shares_memory(polygon_set[2], polygon_set.coords):
+            print("Pass")
+        else:
+            print("FAIL")
+            print(f"    expected {expected} and {[polygons[2], polygons[0]]}, saw {seen} and {subset}")
+
+    def list_measures_001(self):
+        frame = inspect.currentframe()
+        function_name = inspect.getframeinfo(frame).function
+        print(f"{function_name}:", end=" ")
+
+        # small polygons measured by hand: a point, a segment, a square and a 3-4-5 triangle
+        funcs = {'perimeter':pt.polygon_perimeter, 'signed_area':pt.polygon_signed_area, 'area':pt.polygon_area,
+                 'bbox':pt.polygon_mbr, 'circularity':pt.circularity, 'vertex_mean':pt.polygon_center}
+        cases = [([[5, 5]], {'perimeter':0.0, 'signed_area':0.0, 'area':0.0, 'bbox':(5, 5, 1, 1),
+                             'circularity':0.0, 'vertex_mean':(5.0, 5.0)}),
+                 ([[10, 10], [13, 14]], {'perimeter':10.0, 'signed_area':0.0, 'area':0.0, 'bbox':(10, 10, 4, 5),
+                                         'circularity':0.0, 'vertex_mean':(11.5, 12.0)}),
+                 ([[0, 0], [4, 0], [4, 4], [0, 4]], {'perimeter':16.0, 'signed_area':-16.0, 'area':16.0,
+                                                     'bbox':(0, 0, 5, 5), 'circularity':math.pi/4,
+                                                     'vertex_mean':(2.0, 2.0)}),
+                 ([[0, 0], [0, 3], [4, 3]], {'perimeter':12.0, 'signed_area':6.0, 'area':6.0, 'bbox':(0, 0, 5, 4),
+                                             'circularity':math.pi/6, 'vertex_mean':(4/3, 2.0)})]
+        # random polygons measured by the baseline list based functions of bench_vsa
+        rng = np.random.default_rng(1234)
+        for count in (3, 16, 200):
+            polygon = rng.integers(0, 1000, (count, 2)).tolist()
+            area = bench.legacy_polygon_area(polygon)
+            perimeter = bench.legacy_polygon_perimeter(polygon)
+            cases.append((polygon, {'perimeter':perimeter, 'signed_area':bench.legacy_polygon_signed_area(polygon),
+                                    'area':area, 'bbox':bench.legacy_polygon_mbr(polygon),
+                                    'circularity':4.0*math.pi*area/(perimeter*perimeter),
+                                    'vertex_mean':tuple(np.mean(polygon, axis=0).tolist())}))
+        failures = []
+        for polygon, values in cases:
+            # as a list of points, an array and a Polygon
+            for points in [polygon, np.array(polygon, dtype=np.int32), Polygon(polygon)]:
+                for name, func in funcs.items():
+                    seen = func(points)
+                    expected = values[name]
+                    if not np.allclose(seen, expected, rtol=1e-12):
+                        failures.append(f"{name} of {len(polygon)} points ({type(points).__name__}): expected {expected}, saw {seen}")
+        if len(failures) == 0:
+            print("Pass")
+        else:
+            print("FAIL")
+            for failure in failures:
+                print(f"    {failure}")
+
+    def polygon_set_json_001(self):
+        frame = inspect.currentframe()
+        function_name = inspect.getframeinfo(frame).function
+        print(f"{function_name}:", end=" ")
+
+        # a session saved and loaded as in save_session and load_session, with and without polygons
+        polygons = [[[0, 0], [100, 0], [100, 100], [0, 100]],
+                    [[5, 5]],
+                    [[3, 1], [7, 2], [9, 8], [4, 6], [1, 4]]]
+        failures = []
+        for saved in [polygons, []]:
+            session = {'sample_id': "S-1", 'spot_polygons': PolygonSet.from_polygons(saved).to_lists(),
+                       'cal_pix_per_cm': 40.0}
+            with tempfile.TemporaryFile("w+") as file:
+                json.dump(session, file, indent=4)
+                file.seek(0)
+                loaded = json.load(file)
+            if loaded != dict(session, spot_polygons=saved):
+                failures.append(f"{len(saved)} polygons: saw {loaded}")
+            elif PolygonSet.from_polygons(loaded['spot_polygons']).to_lists() != saved:
+                failures.append(f"{len(saved)} polygons: the loaded polygons differ")
+        if len(failures) == 0:
+            print("Pass")
+        else:
+            print("FAIL")
+            for failure in failures:
+                print(f"    {failure}")
+
 
 def main():
     test_class = TestPolygonTools()
@@ -0,0 +1,82 @@
+# Spoti-find - Copyright (C) 2025 The Jackson Laboratory, Inc.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+
+import sys
+import inspect
+import numpy as np
+from polygon import PolygonSet
+from spot_table import SpotTable
+
+class TestSpotTable:
+    def __init__(self):
+        self.test_list = {
+            'class_totals_001':self.class_totals_001
+        }
+
+    def run_all(self):
+        for key in self.test_list:
+            print(f"{key}: ", end=" ")
+            self.test_list[key]()
+        return
+
+    def run_test(self, test_name):
+        print(f"{test_name}: ", end=" ")
+
+        if test_name not in self.test_list:
+            print("TEST NO FOUND")
+            return False
+        self.test_list[test_name]()
+        return True
+
+    def class_totals_001(self):
+        frame = inspect.currentframe()
+        function_name = inspect.getframeinfo(frame).function
+        print(f"{function_name}:", end=" ")
+
+        volume_ul = np.array([30.0, 5.0, 2.0, 1.0, 0.05])
+        columns = {'volume_ul': volume_ul,
+                   'area_cm2': volume_ul / 10.0,
+                   'circularity': np.array([0.9, 0.8, 0.7, 0.6, 0.5]),
+                   'ave_dist_to_edge_cm': np.array([1.0, 2.0, 3.0, 4.0, 5.0])}
+        points = PolygonSet.from_polygons([[[0, 0], [1, 0], [1, 1]]]*5)
+        table = SpotTable(columns, points)
+        table.classify([0.1, 2.0, 22.0])
+        totals = table.class_totals()
+        means = table.class_means(totals)
+        classes = [row['class'] for row in table]
+        expected_classes = ['primary', 'micro', 'micro', 'nano', 'junk']
+        if (classes == expected_classes) and (totals['count'].tolist() == [1, 1, 2, 1]) and \
+                np.allclose(totals['volume_ul'], [0.05, 1.0, 7.0, 30.0]) and \
+                np.allclose(means['circularity'], [0.5, 0.6, 0.75, 0.9]):
+            print("Pass")
+        else:
+            print("FAIL")
+            print(f"    expected classes {expected_classes}, saw {classes}")
+            print(f"    expected counts [1, 1, 2, 1], saw {totals['count'].tolist()}")
+
+
+def main():
+    test_class = TestSpotTable()
+    if len(sys.argv) <= 1:
+        test_class.run_all()
+    else:
+        for test_name in sys.argv[1:]:
+            test_class.run_test(test_name)
+    return
+
+if __name__ == '__main__':
+    main()
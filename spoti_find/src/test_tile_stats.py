@@ -0,0 +1,193 @@
+# Spoti-find - Copyright (C) 2025 The Jackson Laboratory, Inc.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+
+import sys
+import inspect
+import numpy as np
+import cv2
+import tile_stats as ts
+
+class TestTileStats:
+    def __init__(self):
+        self.test_list = {
+            'min_max_median_001':self.min_max_median_001,
+            'median_001':self.median_001,
+            'thresholds_001':self.thresholds_001,
+            'tile_histograms_001':self.tile_histograms_001,
+            'tile_min_max_001':self.tile_min_max_001,
+            'merge_quadrants_001':self.merge_quadrants_001
+        }
+        self.rng = np.random.default_rng(1234)
+
+    def run_all(self):
+        for key in self.test_list:
+            print(f"{key}: ", end=" ")
+            self.test_list[key]()
+        return
+
+    def run_test(self, test_name):
+        print(f"{test_name}: ", end=" ")
+
+        if test_name not in self.test_list:
+            print("TEST NO FOUND")
+            return False
+        self.test_list[test_name]()
+        return True
+
+    def random_roi(self):
+        h, w = self.rng.integers(1, 80, 2)
+        low = self.rng.integers(0, 200)
+        high = self.rng.integers(low+1, 257)
+        return self.rng.integers(low, high, (h, w)).astype(np.uint8)
+
+    def min_max_median_001(self):
+        frame = inspect.currentframe()
+        function_name = inspect.getframeinfo(frame).function
+        print(f"{function_name}:", end=" ")
+
+        failures = 0
+        for _ in range(200):
+            roi = self.random_roi()
+            sorted_list = np.sort(roi.flatten().tolist())
+            expected = (sorted_list[0], sorted_list[-1], sorted_list[int(len(sorted_list)/2)])
+            seen = tuple(int(v) for v in ts.min_max_median(ts.histogram(roi)))
+            if seen != expected:
+                failures += 1
+        if failures == 0:
+            print("Pass")
+        else:
+            print("FAIL")
+            print(f"    {failures} of 200 histograms differ from the sorted list")
+
+
+    def median_001(self):
+        frame = inspect.currentframe()
+        function_name = inspect.getframeinfo(frame).function
+        print(f"{function_name}:", end=" ")
+
+        failures = 0
+        for _ in range(200):
+            roi = self.random_roi()
+            mask = (self.rng.integers(0, 2, roi.shape)*255).astype(np.uint8)
+            values = roi[mask > 0]
+            expected = np.median(values) if values.size > 0 else 0.0
+            if ts.median(ts.histogram(roi, mask)) != expected:
+                failures += 1
+        if failures == 0:
+            print("Pass")
+        else:
+            print("FAIL")
+            print(f"    {failures} of 200 masked medians differ from np.median")
+
+
+    def thresholds_001(self):
+        frame = inspect.currentframe()
+        function_name = inspect.getframeinfo(frame).function
+        print(f"{function_name}:", end=" ")
+
+        failures = 0
+        for _ in range(500):
+            roi = self.random_roi()
+            hist = ts.histogram(roi)
+            thresh_triangle, _ = cv2.threshold(roi, 0, 255, cv2.THRESH_BINARY+cv2.THRESH_TRIANGLE)
+            if int(ts.triangle_threshold(hist)) != int(thresh_triangle):
+                failures += 1
+            # near ties are left to OpenCV by the callers
+            if ts.otsu_ambiguous(hist):
+                continue
+            thresh_otsu, _ = cv2.threshold(roi, 0, 255, cv2.THRESH_BINARY+cv2.THRESH_OTSU)
+            if int(ts.otsu_threshold(hist)) != int(thresh_otsu):
+                failures += 1
+        if failures == 0:
+            print("Pass")
+        else:
+            print("FAIL")
+            print(f"    {failures} thresholds differ from cv2.threshold")
+
+
+    def tile_histograms_001(self):
+        frame = inspect.currentframe()
+        function_name = inspect.getframeinfo(frame).function
+        print(f"{function_name}:", end=" ")
+
+        img = self.rng.integers(0, 256, (253, 317)).astype(np.uint8)
+        win_size = 50
+        hists = ts.tile_histograms(img, win_size)
+        tiles = self.rng.random((6, 7)) < 0.4
+        selected = ts.tile_histograms(img, win_size, tiles)
+        failures = 0
+        for y_idx in range(hists.shape[0]):
+            for x_idx in range(hists.shape[1]):
+                roi = img[y_idx*win_size:(y_idx+1)*win_size, x_idx*win_size:(x_idx+1)*win_size]
+                if not np.array_equal(hists[y_idx, x_idx], ts.histogram(roi)):
+                    failures += 1
+        if not np.array_equal(selected, hists[tiles]):
+            failures += 1
+        if (hists.shape == (6, 7, 256)) and (failures == 0):
+            print("Pass")
+        else:
+            print("FAIL")
+            print(f"    expected (6, 7, 256) matching histograms, saw {hists.shape} with {failures} differences")
+
+    def tile_min_max_001(self):
+        frame = inspect.currentframe()
+        function_name = inspect.getframeinfo(frame).function
+        print(f"{function_name}:", end=" ")
+
+        img = self.rng.integers(0, 256, (253, 317)).astype(np.uint8)
+        win_size = 50
+        tile_min, tile_max = ts.tile_min_max(img, win_size)
+        failures = 0
+        for y_idx in range(tile_min.shape[0]):
+            for x_idx in range(tile_min.shape[1]):
+                roi = img[y_idx*win_size:(y_idx+1)*win_size, x_idx*win_size:(x_idx+1)*win_size]
+                if (tile_min[y_idx, x_idx] != roi.min()) or (tile_max[y_idx, x_idx] != roi.max()):
+                    failures += 1
+        if (tile_min.shape == (6, 7)) and (failures == 0):
+            print("Pass")
+        else:
+            print("FAIL")
+            print(f"    expected (6, 7) matching minima and maxima, saw {tile_min.shape} with {failures} differences")
+
+    def merge_quadrants_001(self):
+        frame = inspect.currentframe()
+        function_name = inspect.getframeinfo(frame).function
+        print(f"{function_name}:", end=" ")
+
+        img = self.rng.integers(0, 256, (253, 317)).astype(np.uint8)
+        _, tile_max = ts.tile_min_max(img, 25)
+        merged = ts.merge_quadrants(tile_max, np.maximum)
+        _, expected = ts.tile_min_max(img, 50)
+        if np.array_equal(merged, expected):
+            print("Pass")
+        else:
+            print("FAIL")
+            print(f"    expected the maxima of the 50 x 50 tiles {expected.shape}, saw {merged.shape}")
+
+
+
+def main():
+    test_class = TestTileStats()
+    if len(sys.argv) <= 1:
+        test_class.run_all()
+    else:
+        for test_name in sys.argv[1:]:
+            test_class.run_test(test_name)
+    return
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,284 @@
+# Spoti-find - Copyright (C) 2025 The Jackson Laboratory, Inc.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+
+import os
+import sys
+import inspect
+import tempfile
+import numpy as np
+import cv2
+
+# vsa uses relative imports, so it is imported from the package
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from spoti_find.src.vsa import VsaProcessor
+from spoti_find.src.polygon import PolygonSet
+from spoti_find.src.area_volume_map import AreaVolumeMap
+from spoti_find.src.artifact_sink import DirectorySink, ThreadedSink
+
+class TestVsa:
+    def __init__(self):
+        self.test_list = {
+            'spot_edits_001':self.spot_edits_001,
+            'analysis_resolution_001':self.analysis_resolution_001,
+            'set_image_001':self.set_image_001,
+            'artifact_sink_001':self.artifact_sink_001
+        }
+        self.volume_mapper = AreaVolumeMap()
+        self.volume_mapper.c1 = 10.0
+        self.pix_per_cm = 20.0
+        self.size_thresholds = [0.5, 2.0, 10.0]
+
+    def run_all(self):
+        for key in self.test_list:
+            print(f"{key}: ", end=" ")
+            self.test_list[key]()
+        return
+
+    def run_test(self, test_name):
+        print(f"{test_name}: ", end=" ")
+
+        if test_name not in self.test_list:
+            print("TEST NO FOUND")
+            return False
+        self.test_list[test_name]()
+        return True
+
+    def open_processor(self, filename):
+        ''' Returns a VsaProcessor with the image open and its paper segmented. '''
+        processor = VsaProcessor()
+        processor.open_image(filename)
+        processor.segment_paper(100)
+        return processor
+
+    def full_spots(self, filename, spot_mask):
+        '''
+        The polygons and spot table of spot_mask, vectorized as a whole, for comparison with
+        the incremental updates.
+        '''
+        contours, _ = cv2.findContours(image=spot_mask, mode=cv2.RETR_EXTERNAL, method=cv2.CHAIN_APPROX_NONE)
+        processor = self.open_processor(filename)
+        processor.set_spot_polygons(PolygonSet.from_contours(contours))
+        processor.measure_spots(self.volume_mapper, self.pix_per_cm, self.size_thresholds)
+        return processor.spot_polygons, processor.spot_table
+
+    def spot_rows(self, table):
+        ''' The rows of a spot table, sorted by their points, so that spots of equal volume compare. '''
+        rows = [dict(row, points=[tuple(p) for p in row['points']]) for row in table]
+        return sorted(rows, key=lambda row: row['points'])
+
+    def same_rows(self, rows, expected):
+        if len(rows) != len(expected):
+            return False
+        for row, expected_row in zip(rows, expected):
+            if row.keys() != expected_row.keys():
+                return False
+            for key, value in row.items():
+                if isinstance(value, float):
+                    if not np.isclose(value, expected_row[key], rtol=1e-9, atol=1e-9):
+                        return False
+                elif value != expected_row[key]:
+                    return False
+        return True
+
+    def spot_edits_001(self):
+        frame = inspect.currentframe()
+        function_name = inspect.getframeinfo(frame).function
+        print(f"{function_name}:", end=" ")
+
+        img = np.full((300, 300), 30, dtype=np.uint8)
+        img[20:280, 20:280] = 220
+        spot_mask = np.zeros(img.shape, dtype=np.uint8)
+        # a ring with a spot in its hole, two spots a gap apart, and a blob
+        cv2.circle(spot_mask, (90, 90), 45, 255, thickness=cv2.FILLED)
+        cv2.circle(spot_mask, (90, 90), 30, 0, thickness=cv2.FILLED)
+        cv2.circle(spot_mask, (90, 90), 10, 255, thickness=cv2.FILLED)
+        cv2.circle(spot_mask, (190, 80), 12, 255, thickness=cv2.FILLED)
+        cv2.circle(spot_mask, (225, 80), 12, 255, thickness=cv2.FILLED)
+        cv2.ellipse(spot_mask, (180, 200), (50, 25), 0, 0, 360, 255, thickness=cv2.FILLED)
+
+        # (description, fill or clear, polygon)
+        edits = [("cut the ring open", "clear", [[85, 40], [95, 40], [95, 65], [85, 65]]),
+                 ("join the spot in the hole to the ring", "fill", [[88, 95], [92, 95], [92, 125], [88, 125]]),
+                 ("close the ring again", "fill", [[85, 40], [95, 40], [95, 65], [85, 65]]),
+                 ("merge two spots", "fill", [[195, 76], [220, 76], [220, 84], [195, 84]]),
+                 ("split the blob", "clear", [[176, 170], [184, 170], [184, 230], [176, 230]]),
+                 ("add a spot", "fill", [[60, 220], [80, 215], [75, 240]]),
+                 ("remove a spot", "clear", [[120, 160], [180, 160], [180, 240], [120, 240]])]
+
+        handle, filename = tempfile.mkstemp(suffix=".png")
+        os.close(handle)
+        failures = []
+        try:
+            cv2.imwrite(filename, img)
+            processor = self.open_processor(filename)
+            processor.spot_mask = spot_mask
+            contours, _ = cv2.findContours(image=spot_mask, mode=cv2.RETR_EXTERNAL, method=cv2.CHAIN_APPROX_NONE)
+            processor._set_spot_polygons(PolygonSet.from_contours(contours))
+            processor.measure_spots(self.volume_mapper, self.pix_per_cm, self.size_thresholds)
+
+            for description, action, polygon in edits:
+                if action == "fill":
+                    processor.fill_poly_selection(polygon)
+                else:
+                    processor.clear_poly_selection(polygon)
+                processor.measure_spots(self.volume_mapper, self.pix_per_cm, self.size_thresholds)
+                expected_polygons, expected_table = self.full_spots(filename, processor.spot_mask)
+                polygons = sorted(processor.spot_polygons.to_lists())
+                if polygons != sorted(expected_polygons.to_lists()):
+                    failures.append(f"{description}: polygons differ, {len(polygons)} spots, expected {len(expected_polygons)}")
+                elif not self.same_rows(self.spot_rows(processor.spot_table), self.spot_rows(expected_table)):
+                    failures.append(f"{description}: spot tables differ")
+        finally:
+            os.remove(filename)
+
+        if len(failures) == 0:
+            print("Pass")
+        else:
+            print("FAIL")
+            for failure in failures:
+                print(f"    {failure}")
+
+    def analysis_resolution_001(self):
+        frame = inspect.currentframe()
+        function_name = inspect.getframeinfo(frame).function
+        print(f"{function_name}:", end=" ")
+
+        # an 80 px/cm scan with four bright spots of different sizes on the paper
+        img = np.full((640, 800), 20, dtype=np.uint8)
+        img[40:600, 40:760] = 120
+        for x, y, radius in [(200, 200, 60), (500, 180, 40), (400, 420, 90), (650, 450, 25)]:
+            cv2.circle(img, (x, y), radius, 240, thickness=cv2.FILLED)
+        img = cv2.GaussianBlur(img, (0, 0), 3)
+        file_pix_per_cm = 80.0
+
+        handle, filename = tempfile.mkstemp(suffix=".png")
+        os.close(handle)
+        tables = []
+        try:
+            cv2.imwrite(filename, img)
+            for analysis_pix_per_cm in [None, 40.0]:
+                processor = VsaProcessor()
+                processor.analysis_pix_per_cm = analysis_pix_per_cm
+                processor.tile_size_cm = 2.5
+                processor.open_image(filename, file_pix_per_cm)
+                processor.segment_paper(70)
+                processor.segment_spots(0, 40, 10, file_pix_per_cm)
+                processor.measure_spots(self.volume_mapper, file_pix_per_cm, self.size_thresholds)
+                tables.append(processor.spot_table)
+        finally:
+            os.remove(filename)
+
+        # the reduced image loses a little of each spot's edge
+        full, reduced = tables
+        failures = []
+        if len(full) != 4 or len(reduced) != 4:
+            failures.append(f"expected 4 spots at both resolutions, saw {len(full)} and {len(reduced)}")
+        else:
+            for key in ['area_cm2', 'perimeter_cm', 'ave_dist_to_edge_cm', 'area_pix2', 'perimeter_pix']:
+                if not np.allclose(reduced[key], full[key], rtol=0.05):
+                    failures.append(f"{key}: expected {full[key].tolist()}, saw {reduced[key].tolist()}")
+            # the points are in file pixels, within the bounding box of each spot
+            for idx, row in enumerate(reduced):
+                x, y, w, h = cv2.boundingRect(np.asarray(row['points'], dtype=np.int32))
+                box = [row['img_x'], row['img_y'], row['img_w'], row['img_h']]
+                if not np.allclose([x, y, w, h], box, atol=2):
+                    failures.append(f"spot {idx}: points bound {[x, y, w, h]}, expected {box}")
+        if len(failures) == 0:
+            print("Pass")
+        else:
+            print("FAIL")
+            for failure in failures:
+                print(f"    {failure}")
+
+    def set_image_001(self):
+        frame = inspect.currentframe()
+        function_name = inspect.getframeinfo(frame).function
+        print(f"{function_name}:", end=" ")
+
+        # images in memory, named by a file that does not exist
+        filename = os.path.join(tempfile.gettempdir(), "no_such_dir", "scan.tif")
+        img = np.full((300, 400), 30, dtype=np.uint8)
+        img[20:280, 20:380] = 220
+        other = img.copy()
+        other[100:200, 100:200] = 120
+        failures = []
+        processor = VsaProcessor()
+        if not processor.set_image(img, filename) or not processor.segment_paper(100):
+            failures.append("the image was not set and segmented")
+        key = processor.image_key
+        processor.set_image(img.copy(), filename)
+        if processor.image_key != key:
+            failures.append("the same pixels have a different key")
+        processor.set_image(other, filename)
+        if processor.image_key == key:
+            failures.append("different pixels have the same key")
+        # a scan differing in one pixel, off the rows and columns of any sample of them
+        large = cv2.resize(img, (1600, 1200), interpolation=cv2.INTER_NEAREST)
+        processor.set_image(large, filename)
+        large_key = processor.image_key
+        edited = large.copy()
+        edited[601, 801] = 221
+        processor.set_image(edited, filename)
+        if processor.image_key == large_key:
+            failures.append("images differing in one pixel have the same key")
+        if len(failures) == 0:
+            print("Pass")
+        else:
+            print("FAIL")
+            for failure in failures:
+                print(f"    {failure}")
+
+    def artifact_sink_001(self):
+        frame = inspect.currentframe()
+        function_name = inspect.getframeinfo(frame).function
+        print(f"{function_name}:", end=" ")
+
+        # two images processed with one sink keep their own artifacts
+        img = np.full((300, 300), 30, dtype=np.uint8)
+        img[20:280, 20:280] = 120
+        cv2.circle(img, (150, 150), 40, 240, thickness=cv2.FILLED)
+        artifacts = ["debug_stack.tif", "dist_map.tif", "extended_img.tif"]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            sink = ThreadedSink(DirectorySink(tmp_dir), max_pending=100)
+            for filename in ["scan_a.tif", "scan_b.tif"]:
+                processor = VsaProcessor()
+                processor.artifact_sink = sink
+                processor.set_image(img, os.path.join(tmp_dir, "missing", filename))
+                processor.segment_paper(70)
+                processor.segment_spots(0, 40, 10)
+                processor.get_dist_map()
+            sink.close()
+            names = sorted(os.listdir(tmp_dir))
+        expected = [f"{stem}_{name}" for stem in ["scan_a", "scan_b"] for name in artifacts]
+        if names == expected:
+            print("Pass")
+        else:
+            print("FAIL")
+            print(f"    expected {expected}, saw {names}")
+
+
+def main():
+    test_class = TestVsa()
+    if len(sys.argv) <= 1:
+        test_class.run_all()
+    else:
+        for test_name in sys.argv[1:]:
+            test_class.run_test(test_name)
+    return
+
+if __name__ == '__main__':
+    main()
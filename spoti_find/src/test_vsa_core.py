@@ -0,0 +1,159 @@
+# Spoti-find - Copyright (C) 2025 The Jackson Laboratory, Inc.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+
+import os
+import sys
+import inspect
+import numpy as np
+import cv2
+
+# vsa_core uses relative imports, so it is imported from the package
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from spoti_find.src import vsa_core as core
+
+class TestVsaCore:
+    def __init__(self):
+        self.test_list = {
+            'paper_pyramid_001':self.paper_pyramid_001,
+            'paper_pyramid_002':self.paper_pyramid_002,
+            'paper_pyramid_003':self.paper_pyramid_003,
+            'paper_pyramid_004':self.paper_pyramid_004
+        }
+        self.rng = np.random.default_rng(1234)
+
+    def run_all(self):
+        for key in self.test_list:
+            print(f"{key}: ", end=" ")
+            self.test_list[key]()
+        return
+
+    def run_test(self, test_name):
+        print(f"{test_name}: ", end=" ")
+
+        if test_name not in self.test_list:
+            print("TEST NO FOUND")
+            return False
+        self.test_list[test_name]()
+        return True
+
+    def paper_image(self, shape, rect):
+        ''' A noisy image of a bright paper, rect = (x, y, w, h), on a dark background. '''
+        img = np.full(shape, 30, dtype=np.uint8)
+        x, y, w, h = rect
+        img[y:y+h, x:x+w] = 200
+        img = cv2.GaussianBlur(img, (0, 0), 1.5)
+        noise = self.rng.integers(-8, 9, shape)
+        return np.clip(img.astype(int) + noise, 0, 255).astype(np.uint8)
+
+    def pyramid_differences(self, images):
+        '''
+        Returns a line for every image, (name, img, threshold), and pyramid scale whose paper
+        mask differs from the full resolution mask.
+        '''
+        failures = []
+        for name, img, threshold in images:
+            full = core.segment_paper(img, threshold).mask
+            for scale in [4, 8]:
+                mask = core.segment_paper(img, threshold, pyramid_scale=scale).mask
+                differ = np.count_nonzero(mask != full)
+                if differ > 0:
+                    failures.append(f"{name} at 1/{scale}: {differ} pixels of the paper mask differ")
+        return failures
+
+    def paper_images(self, cases):
+        ''' The images, (name, img, threshold), of the cases, (shape, rect). '''
+        return [(f"{shape} paper {rect}", self.paper_image(shape, rect), 100) for shape, rect in cases]
+
+    def paper_pyramid_001(self):
+        frame = inspect.currentframe()
+        function_name = inspect.getframeinfo(frame).function
+        print(f"{function_name}:", end=" ")
+
+        # paper touching the border of the image, on sizes that are and are not multiples of the scale
+        cases = [((400, 600), (0, 0, 450, 300)),
+                 ((400, 600), (0, 0, 600, 400)),
+                 ((403, 605), (40, 30, 565, 373)),
+                 ((397, 611), (0, 20, 611, 377))]
+        failures = self.pyramid_differences(self.paper_images(cases))
+        if len(failures) == 0:
+            print("Pass")
+        else:
+            print("FAIL")
+            for failure in failures:
+                print(f"    {failure}")
+
+    def paper_pyramid_002(self):
+        frame = inspect.currentframe()
+        function_name = inspect.getframeinfo(frame).function
+        print(f"{function_name}:", end=" ")
+
+        # paper inside the image
+        cases = [((400, 600), (60, 50, 460, 300)),
+                 ((403, 605), (70, 60, 430, 270))]
+        failures = self.pyramid_differences(self.paper_images(cases))
+        if len(failures) == 0:
+            print("Pass")
+        else:
+            print("FAIL")
+            for failure in failures:
+                print(f"    {failure}")
+
+    def paper_pyramid_003(self):
+        frame = inspect.currentframe()
+        function_name = inspect.getframeinfo(frame).function
+        print(f"{function_name}:", end=" ")
+
+        # background with isolated bright pixels on the 1/8 samples, which the opening of the
+        # paper mask removes
+        img = np.full((400, 600), 30, dtype=np.uint8)
+        img[4::40, 4::40] = 200
+        seen = [core.segment_paper(img, 100, pyramid_scale=scale) for scale in [1, 8]]
+        if all(paper is None for paper in seen):
+            print("Pass")
+        else:
+            print("FAIL")
+            print(f"    expected no paper at 1/1 and 1/8, saw {[paper is not None for paper in seen]}")
+
+    def paper_pyramid_004(self):
+        frame = inspect.currentframe()
+        function_name = inspect.getframeinfo(frame).function
+        print(f"{function_name}:", end=" ")
+
+        # a scan whose paper is separated from a bright region by a gap of about 3 pixels,
+        # narrower than a block at 1/4 and 1/8
+        filename = os.path.join(os.path.dirname(__file__), "..", "..", "test_data", "extended_img.tif")
+        img = cv2.imread(filename, cv2.IMREAD_GRAYSCALE)
+        failures = self.pyramid_differences([("extended_img.tif", img, 84)])
+        if len(failures) == 0:
+            print("Pass")
+        else:
+            print("FAIL")
+            for failure in failures:
+                print(f"    {failure}")
+
+
+def main():
+    test_class = TestVsaCore()
+    if len(sys.argv) <= 1:
+        test_class.run_all()
+    else:
+        for test_name in sys.argv[1:]:
+            test_class.run_test(test_name)
+    return
+
+if __name__ == '__main__':
+    main()
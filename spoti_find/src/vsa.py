@@ -20,14 +20,48 @@ Copyright The Jackson Laboratory, 2023
 authors: Jim Peterson
 
 The VsaProcessor class implements the "voided spot analysys" on
-images of mouse cage floor papers.
+images of mouse cage floor papers.  The stages of the analysis are the
+functions of vsa_core; VsaProcessor holds the image, the results of each
+stage and the spots as they are edited in the GUI.
 
 """
 import os
-import math
+import hashlib
 import numpy as np
 import cv2
 from . import polygon_tools as pt
+from . import tile_stats as ts
+from . import vsa_core as core
+from .polygon import PolygonSet
+from .spot_table import SpotTable
+from .lru_cache import LruCache
+from .artifact_sink import ArtifactSink
+
+
+def _image_key(img, filename, img_scale):
+    '''
+    Returns the identity of the image, for the paper cache: the absolute path, modification
+    time and size of filename, and img_scale.  When filename cannot be read, for an image
+    without a file, it is the shape and type of img and a hash of all of its pixels instead,
+    about 25 ms for a 6000 x 4000 image.
+    '''
+    try:
+        file_stat = os.stat(filename)
+    except OSError:
+        digest = hashlib.blake2b(memoryview(np.ascontiguousarray(img)), digest_size=16).hexdigest()
+        return (img.shape, img.dtype.str, digest, img_scale)
+    return (os.path.abspath(filename), file_stat.st_mtime_ns, file_stat.st_size, img_scale)
+
+
+def _paper_field(field, default=None):
+    ''' A read-only VsaProcessor attribute holding a field of its Paper, or default without one. '''
+    return property(lambda self: default if self.paper is None else getattr(self.paper, field))
+
+
+def _dist_field(field, default=None):
+    ''' A read-only VsaProcessor attribute holding a field of its DistMap, or default without one. '''
+    return property(lambda self: default if self.distances is None else getattr(self.distances, field))
+
 
 class VsaProcessor():
 
@@ -37,48 +71,101 @@ class VsaProcessor():
         These class variables should be accessed via the "get_" functions.
         """
         self.image_file = ""        # File name of currently open image
-        self.img = None             # Grayscale image of cage floor paper
-        self.img_extended = None
-        self.paper_mask = None  # Binary mask of paper
-        self.paper_polygon = []
+        self.image_key = None       # Identity of the image, see _image_key()
+        self.img = None             # Grayscale image of cage floor paper, read-only
+        self.img_hist = None        # histogram of img, see get_img_histogram()
+        self.paper = None           # vsa_core.Paper found by segment_paper()
+        self.paper_key = None       # key of the current paper results in paper_cache
+        self.distances = None       # vsa_core.DistMap of the paper, see get_dist_map()
+        self.dist_engine = "map"    # "map" (distance transform) or "polygon" (distance to paper_polygon)
+        self.pyramid_scale = 1      # 1, or 4 or 8 to segment the paper on blocks of that size first
+        self.analysis_pix_per_cm = None # resolution the image is reduced to on opening, None for the file's resolution; headless only, see open_image()
+        self.img_scale = 1.0        # pixels of img per pixel of the image file, see open_image()
         self.spot_mask = None
-        self.spot_polygons = []
-        self.spot_polygon_properties = []
+        self.spot_polygons = PolygonSet()
+        self.spot_boxes = np.zeros((0, 4), dtype=np.int64)  # (x, y, w, h) of each spot
+        self.spot_geometry = []     # cached pixel measurements of each spot, None until measured
+        self.spot_columns = None    # spot_geometry as arrays, None when out of date
+        self.spot_scale = None      # (pix_per_cm, volumes) of spot_table
+        self.spot_table = SpotTable()   # measurements of the spots, see measure_spots()
         self.roi_polygons = []
         self.win_size = 100
-
-    def open_image(self, filename: str) -> bool:
+        self.tile_size_cm = None    # size of the spot tiles in cm, in place of win_size, see segment_spots()
+        self.quadtree_levels = 3    # levels above the win_size tiles in the spot candidate quadtree
+        self.spot_engine = "block"  # "block" (all tiles at once), "tile" (tile by tile), or "niblack" or "sauvola" (experimental local thresholds, see vsa_core.local_spot_mask)
+        self.spot_threads = 1       # threads thresholding the tiles of the "tile" engine
+        self.artifact_sink = ArtifactSink()  # destination of debug images, discarded by default
+        self.paper_cache = LruCache()   # (Paper, DistMap) by (image_key, threshold, pyramid_scale)
+
+    # The results of segment_paper() and get_dist_map()
+    paper_mask = _paper_field('mask')           # Binary mask of paper
+    paper_polygon = _paper_field('polygon', [])
+    paper_bbox = _paper_field('bbox')           # (x, y, w, h) of paper_polygon
+    paper_crop = _paper_field('crop')           # (x, y, w, h) of the region processed
+    paper_hist = _paper_field('hist')           # histogram of img within paper_mask
+    img_median = _paper_field('median')         # median of the paper
+    img_extended = _paper_field('extended')     # img within paper_crop, with the median of the paper off the paper
+    dist_map = _dist_field('map')               # distance to the edge of the paper, see get_dist_map()
+    dist_origin = _dist_field('origin', (0, 0)) # image coordinates of dist_map[0, 0]
+
+    def open_image(self, filename: str, pix_per_cm=None) -> bool:
         """
         Opens image file.  The specified image file is opened as a grayscale image.
         both 8-bit and 16-bit images are supported in standard formats.
         After the successful call, the class variables "image_file" and "img" are set,
         and all others are reset.
 
+        When analysis_pix_per_cm is set and is below the resolution of the file, pix_per_cm,
+        the image is reduced to analysis_pix_per_cm once, with area interpolation, and
+        img_scale is set to the ratio of the two.  Everything is then processed at the lower
+        resolution, and measure_spots() reports the measurements of the image file.
+
+        Reducing the image is for headless use only, and analysis_pix_per_cm must stay None
+        by default.  The spot polygons, the spot mask and the ROIs are in the coordinates of
+        the reduced image, while the GUI draws and saves them in those of the file, so the
+        GUI never sets it; vsa_batch sets it from its --analysis-pix-per-cm option.  The
+        spot volumes also drift: on the Validation images, reducing them to 40 to 20 px/cm
+        changes the volumes by 32% to 50% on average, as large spots split or merge through
+        thin bridges (see the "analysis_resolution" benchmark in bench_vsa).
+
         Parameters:
             filename (string) - image file to open and process
+            pix_per_cm (float) - resolution of the image file, needed to reduce it
         returns:
             True if sucessful, False otherwise
         """
+        return self.set_image(cv2.imread(filename, cv2.IMREAD_GRAYSCALE), filename, pix_per_cm)
+
+    def set_image(self, img, filename: str, pix_per_cm=None) -> bool:
+        """
+        Sets the image to process to img, the grayscale image already read from filename, as
+        open_image() does after reading it.  The image is not copied, and is not modified.
+        """
         # Reset all variables
         self.image_file = ""
+        self.image_key = None
         self.img = None
-        self.paper_mask = None
-        self.dist_map = None
+        self.img_hist = None
+        self.paper = None
+        self.paper_key = None
+        self.distances = None
         self.spot_mask = None
 
-        self.paper_polygon = []
-        self.spot_polygons = []
-        self.spot_polygon_properties = []
+        self._set_spot_polygons(PolygonSet())
+        self.spot_table = SpotTable()
 
         self.roi = [0, 0, 0, 0]
         self.roi_mask = None
         self.roi_polygons = []
 
-        img = cv2.imread(filename, cv2.IMREAD_GRAYSCALE)
         if (img is None) or (not img.data):
             return False
+        img, self.img_scale = core.reduce_image(img, pix_per_cm, self.analysis_pix_per_cm)
         self.image_file = filename
-        self.img = img
+        self.image_key = _image_key(img, filename, self.img_scale)
+        # A read-only view, so that the stages can share it
+        self.img = img.view()
+        self.img.setflags(write=False)
         h, w = self.img.shape
         self.spot_mask = np.zeros((h, w)).astype(np.uint8)
         return True
@@ -104,24 +191,25 @@ class VsaProcessor():
             return 0,0
 
 
+    def get_img_histogram(self):
+        """
+        Returns the 256-bin histogram of the currently open image.  It is computed once per
+        image, and shared by everything that needs the statistics of the whole image.
+        """
+        if self.img_hist is None:
+            self.img_hist = ts.histogram(self.img)
+            self.img_hist.setflags(write=False)
+        return self.img_hist
+
+
     def get_default_paper_threshold(self):
         '''
-        The default threshold for segmentation of the paper from the background is a weighted
-        average of thresholds computed from the triangle and Otsu methods, with the triangle
-        threshold given a weight of 0.75.
+        Returns the default threshold of the paper, from the image histogram (see
+        vsa_core.default_paper_threshold), or -1 without an image.
         '''
         if not self.have_img():
             return -1
-        triangle_weight = 0.75
-        thresh, _ = cv2.threshold(self.img, 0, 255, cv2.THRESH_BINARY+cv2.THRESH_TRIANGLE)
-        thresh_otsu, _ = cv2.threshold(self.img, 0, 255, cv2.THRESH_BINARY+cv2.THRESH_OTSU)
-        thresh_triangle, _ = cv2.threshold(self.img, 0, 255, cv2.THRESH_BINARY+cv2.THRESH_TRIANGLE)
-        thresh = int((1.0-triangle_weight)*thresh_otsu+(triangle_weight)*thresh_triangle)
-
-        thresh = int(thresh)
-        thresh = max(thresh, 0)
-        thresh = min(thresh, 255)
-        return int(thresh)
+        return core.default_paper_threshold(self.img, self.get_img_histogram())
 
 
     def segment_paper(self, threshold) -> bool:
@@ -129,98 +217,194 @@ class VsaProcessor():
         Segmenting the paper from the background, this function computes the binary
         mask of the floor paper.  The resulting image has a value of 255 where the
         paper is identified, and 0 on the background.  This function processed the
-        current image, self.img, and creates the mask, self.paper_mask.
+        current image, self.img, and sets self.paper (see vsa_core.segment_paper).
 
-        The mask is created with the fixed threshold.
+        The mask is created with the fixed threshold.  The results for each image and
+        threshold are kept in self.paper_cache, so going back to a threshold that was
+        used before does not segment the paper again.  When pyramid_scale is above 1,
+        the paper is found on blocks of that size first, with the same mask.
         """
         if not self.have_img():
             return False
-        _, paper_mask = cv2.threshold(self.img, threshold, 255, cv2.THRESH_BINARY)
-        if (paper_mask is None) or (not np.any(paper_mask)):
-            return False
-        kernel = np.ones((3,3), np.uint8)
-        paper_mask = cv2.erode(paper_mask, kernel, iterations=1)
-        paper_mask = cv2.dilate(paper_mask, kernel, iterations=1)
-        paper_contours, _ = cv2.findContours(image=paper_mask, mode=cv2.RETR_EXTERNAL, method=cv2.CHAIN_APPROX_NONE)
-        idx_of_largest_contour = pt.largest_contour(paper_contours)
-        self.paper_mask = np.zeros(paper_mask.shape, dtype=np.uint8)
-        cv2.drawContours(self.paper_mask, [paper_contours[idx_of_largest_contour]], -1, color=255, thickness=cv2.FILLED)
-        self.paper_polygon = pt.contour_to_polygon(paper_contours[idx_of_largest_contour])
-        self.extend_image()
-
-        # Create distance map
-        self.dist_map = cv2.distanceTransform(self.paper_mask, cv2.DIST_L2, 3)
-        self.dist_map = self.dist_map.astype(np.uint16)
-        papermask = self.paper_mask.astype(np.uint16)
-        cv2.imwritemulti("dist_map.tif", [self.dist_map, papermask])
+        cache_key = None if self.image_key is None else (self.image_key, threshold, self.pyramid_scale)
+        cached = None if cache_key is None else self.paper_cache.get(cache_key)
+        if cached is None:
+            paper = core.segment_paper(self.img, threshold, self.pyramid_scale, self.win_size)
+            if paper is None:
+                return False
+            # The distance map is only computed when the spots are measured
+            cached = (paper, None)
+            if cache_key is not None:
+                self.paper_cache.put(cache_key, cached)
+            if self.artifact_sink.enabled:
+                self._write_artifact("extended_img.tif", [paper.extended])
+        self.paper, self.distances = cached
+        self.paper_key = cache_key
+
+        # The spot measurements depend on the distance map
+        self.spot_geometry = [None]*len(self.spot_polygons)
+        self.spot_columns = None
         return True
 
 
+    def _write_artifact(self, name, images):
+        '''
+        Writes the images to artifact_sink under name, prefixed by the name of the image
+        file without its extension, so that the artifacts of the images processed with one
+        sink do not overwrite each other.
+        '''
+        stem = os.path.splitext(os.path.basename(self.image_file))[0]
+        if stem:
+            name = f"{stem}_{name}"
+        self.artifact_sink.write(name, images)
+
+
+    def get_paper_area(self):
+        ''' Returns the area of paper_polygon in pixels of the image file (see open_image). '''
+        return pt.polygon_area(self.paper_polygon) / (self.img_scale**2)
+
+
+    def get_dist_map(self):
+        '''
+        Returns the distance from each pixel of the paper to the nearest pixel off the paper,
+        as float32, over the bounding box of the paper from self.dist_origin (see
+        vsa_core.dist_map).  It is computed on first use and kept with the other paper results.
+        '''
+        if (self.distances is None) and (self.paper is not None):
+            self.distances = core.dist_map(self.paper)
+            if self.paper_key is not None:
+                self.paper_cache.put(self.paper_key, (self.paper, self.distances))
+            if self.artifact_sink.enabled:
+                x1, y1 = self.dist_origin
+                h, w = self.dist_map.shape
+                self._write_artifact("dist_map.tif", [self.dist_map, self.paper_mask[y1:y1+h, x1:x1+w].astype(np.float32)])
+        return self.dist_map
+
+
+    def set_dist_engine(self, engine):
+        '''
+        Selects how the distance of the spots to the edge of the paper is measured: "map",
+        from the distance map (see get_dist_map), or "polygon", from the distance of each spot
+        pixel to paper_polygon, which needs no distance map.  The spots are measured again.
+        '''
+        if engine not in ("map", "polygon"):
+            raise ValueError(f"unknown distance engine: {engine}")
+        if engine != self.dist_engine:
+            self.dist_engine = engine
+            self.spot_geometry = [None]*len(self.spot_polygons)
+            self.spot_columns = None
+        return
+
+
+    def _edge_distances(self, xs, ys):
+        '''
+        Returns the distance to the edge of the paper of the pixels at (xs, ys), as float32,
+        with 0 for pixels off the paper, by the distance engine.
+        '''
+        if self.dist_engine == "polygon":
+            return core.polygon_edge_distances(self.paper, xs, ys)
+        self.get_dist_map()
+        return core.map_edge_distances(self.distances, xs, ys)
+
+
     def measure_spots(self, volume_mapper, pix_per_cm, size_thresh_list) -> float:
         """
-        Measures the area of all the currently identified spots.
+        Measures the area of all the currently identified spots.  The pixel measurements
+        of each spot are cached in self.spot_geometry, so only the spots added since the
+        last call are measured (see vsa_core.measure_spot_geometry).  The physical
+        measurements are rescaled from the cached columns only when the resolution or the
+        volume mapping change, and a change to the size thresholds only reclassifies the spots.
+
+        pix_per_cm is the resolution of the image file.  When the image was reduced on
+        opening (see open_image), the pixel measurements, the points of the table and the
+        returned area are scaled back to the pixels of the image file, while
+        self.spot_polygons stay in the pixels of self.img (see vsa_core.scale_spots).
         """
-        self.spot_polygon_properties = []
-        for polygon in self.spot_polygons:
-            poly_props = {}
-
-            # img_x, img_y, img_w, img_h
-            x, y, w, h = pt.polygon_mbr(polygon)
-            poly_props['img_x'] = x
-            poly_props['img_y'] = y
-            poly_props['img_w'] = w
-            poly_props['img_h'] = h
-
-            # perimeter_pix
-            poly_props['perimeter_pix'] = pt.polygon_perimeter(polygon)
-            poly_props['perimeter_cm'] = poly_props['perimeter_pix'] / pix_per_cm
-
-            # area_pix2
-            poly_props['area_pix2'] = pt.polygon_area(polygon)
-            poly_props['area_cm2'] = poly_props['area_pix2'] / (pix_per_cm**2)
-            poly_props['volume_ul'] = volume_mapper.map_area(poly_props['area_cm2'])
-            if len(size_thresh_list) == 3:
-                if poly_props['volume_ul'] < size_thresh_list[0]:
-                    poly_props['class'] = 'junk'
-                elif poly_props['volume_ul'] < size_thresh_list[1]:
-                    poly_props['class'] = 'nano'
-                elif poly_props['volume_ul'] < size_thresh_list[2]:
-                    poly_props['class'] = 'micro'
-                else:
-                    poly_props['class'] = 'primary'
-
-            # circularity
-            poly_props['circularity'] = pt.circularity(polygon)
-
-            # dist_to_edge_pix
-            spot_mask = np.zeros(self.paper_mask.shape, dtype=np.uint8)
-            cv2.drawContours(spot_mask, [pt.polygon_to_contour(polygon)], -1, color=255, thickness=cv2.FILLED)
-            count = np.sum(spot_mask == 255)
-            masked_dist_map = np.where(spot_mask>0, self.dist_map, 0)
-            sum = np.sum(masked_dist_map)
-            poly_props['ave_dist_to_edge_pix'] = sum/count
-            poly_props['ave_dist_to_edge_cm'] = poly_props['ave_dist_to_edge_pix'] / pix_per_cm
-            poly_props['points'] = polygon
-
-            self.spot_polygon_properties.append(poly_props)
-
-
-        self.spot_polygon_properties = sorted(self.spot_polygon_properties, key=lambda d: d['volume_ul'], reverse=True)
+        missing = [idx for idx, geometry in enumerate(self.spot_geometry) if geometry is None]
+        if len(missing) > 0:
+            measured = core.measure_spot_geometry(self.img, self.spot_polygons.take(missing), self._edge_distances)
+            for idx, geometry in zip(missing, measured):
+                self.spot_geometry[idx] = geometry
+            self.spot_columns = None
+        if self.spot_columns is None:
+            self.spot_columns = core.geometry_columns(self.spot_geometry)
+            self.spot_scale = None
+
+        pix_per_cm = pix_per_cm * self.img_scale
+        area_cm2 = self.spot_columns['area_pix2'] / (pix_per_cm**2)
+        volume_ul = volume_mapper.map_area(area_cm2)
+        if (self.spot_scale is None) or (self.spot_scale[0] != pix_per_cm) or not np.array_equal(self.spot_scale[1], volume_ul):
+            self.spot_table = core.scale_spots(self.spot_columns, self.spot_polygons, pix_per_cm, self.img_scale, area_cm2, volume_ul)
+            self.spot_scale = (pix_per_cm, volume_ul)
+
         area_pix = 0.0
-        for prop in self.spot_polygon_properties:
-            if prop['class'] == 'junk':
-                break
-            area_pix += prop['area_pix2']
+        if len(size_thresh_list) == 3:
+            self.spot_table.classify(size_thresh_list)
+            # The spots are sorted by volume, so the junk spots come last
+            not_junk = self.spot_table['class_code'] > 0
+            area_pix = sum(self.spot_table['area_pix2'][not_junk].tolist(), 0.0)
         return area_pix
 
 
-    def _vectorize_spots(self):
-        polygons = []
-        spot_contours, _ = cv2.findContours(image=self.spot_mask, mode=cv2.RETR_EXTERNAL, method=cv2.CHAIN_APPROX_NONE)
-        for contour in spot_contours:
-            polygon = pt.contour_to_polygon(contour)
-            polygons.append(polygon)
+    @property
+    def spot_polygon_properties(self):
+        '''
+        The spot property dictionaries, in order of decreasing volume.  This is the SpotTable,
+        which gives the dictionaries when iterated over or indexed by row.
+        '''
+        return self.spot_table
+
+
+    def _vectorize_spots(self, dirty_rect, halo=2):
+        '''
+        Extracts the spot polygons from the part of self.spot_mask that may have changed,
+        dirty_rect = [x, y, w, h]: spots near the rectangle are extracted again, and all
+        other spots keep their cached measurements.
+        '''
+        img_h, img_w = self.spot_mask.shape
+        x1 = max(dirty_rect[0] - halo, 0)
+        y1 = max(dirty_rect[1] - halo, 0)
+        x2 = min(dirty_rect[0] + dirty_rect[2] + halo, img_w)
+        y2 = min(dirty_rect[1] + dirty_rect[3] + halo, img_h)
+        if (x1 >= x2) or (y1 >= y2):
+            return
+
+        # Any spot near the dirty rectangle may have been changed, merged or split, and the
+        # spots inside its holes may have been covered or uncovered.  Grow the search region
+        # until it holds every spot it overlaps, then the external contours of the region are
+        # exactly the spots that replace the overlapped ones.
+        boxes = self.spot_boxes
+        box_x2 = boxes[:, 0] + boxes[:, 2]
+        box_y2 = boxes[:, 1] + boxes[:, 3]
+        while True:
+            hit = (boxes[:, 0] < x2) & (box_x2 > x1) & (boxes[:, 1] < y2) & (box_y2 > y1)
+            if not hit.any():
+                break
+            grown = (min(x1, boxes[hit, 0].min()), min(y1, boxes[hit, 1].min()),
+                     max(x2, box_x2[hit].max()), max(y2, box_y2[hit].max()))
+            if grown == (x1, y1, x2, y2):
+                break
+            x1, y1, x2, y2 = grown
+
+        region_contours, _ = cv2.findContours(image=self.spot_mask[y1:y2, x1:x2], mode=cv2.RETR_EXTERNAL,
+                                              method=cv2.CHAIN_APPROX_NONE, offset=(int(x1), int(y1)))
+        region_polygons = PolygonSet.from_contours(region_contours)
+
+        kept = np.flatnonzero(~hit)
+        self.spot_polygons = PolygonSet.concatenate([self.spot_polygons.take(kept), region_polygons])
+        self.spot_geometry = [self.spot_geometry[idx] for idx in kept.tolist()] + [None]*len(region_polygons)
+        self.spot_columns = None
+        self.spot_boxes = np.vstack([boxes[~hit], region_polygons.bboxes()])
+
+
+    def _set_spot_polygons(self, polygons):
+        '''
+        Replaces all of the spots with the given PolygonSet, clearing their cached measurements.
+        '''
         self.spot_polygons = polygons
+        self.spot_geometry = [None]*len(polygons)
+        self.spot_columns = None
+        self.spot_boxes = polygons.bboxes()
 
 
     def save_roi_spots(self):
@@ -231,7 +415,7 @@ class VsaProcessor():
         w = self.roi[2]
         h = self.roi[3]
         self.spot_mask[y:y+h, x:x+w] = np.bitwise_or(self.spot_mask[y:y+h, x:x+w], self.roi_mask)
-        self._vectorize_spots()
+        self._vectorize_spots(self.roi)
         return
 
 
@@ -241,7 +425,7 @@ class VsaProcessor():
         contour = pt.polygon_to_contour(polygon)
         #mask = np.zeros(self.img.shape, dtype=np.uint8)
         cv2.drawContours(self.spot_mask, [contour], -1, color=0, thickness=cv2.FILLED)
-        self._vectorize_spots()
+        self._vectorize_spots(pt.polygon_mbr(polygon))
         return
 
 
@@ -251,136 +435,66 @@ class VsaProcessor():
         contour = pt.polygon_to_contour(polygon)
         #mask = np.zeros(self.img.shape, dtype=np.uint8)
         cv2.drawContours(self.spot_mask, [contour], -1, color=255, thickness=cv2.FILLED)
-        self._vectorize_spots()
+        self._vectorize_spots(pt.polygon_mbr(polygon))
         return
 
 
-    def extend_image(self):
+    def set_spot_polygons(self, polygons):
         '''
-        This function computes the median value of the image in the paper mask area.  This value is then
-        written to all pixels in the original image, outside the paper mask.
-
-        Note: it may be better to set the value of the background pixels to the value closest in the mask.
+        Replaces all of the spots, given as a PolygonSet or as a list of polygons, and
+        redraws the spot mask from them.
         '''
-        tmp_list = np.where(self.paper_mask>0, self.img, 0).flatten().tolist()
-        tmp_list = [x for x in tmp_list if x > 0]
-        self.img_median = np.median(tmp_list)
-        img_type = type(self.img[0][0])
-        self.img_extended = np.where(self.paper_mask>0, self.img, self.img_median).astype(img_type)
-
-        dir_name = os.path.dirname(self.image_file)
-        extended_img_path = os.path.join(dir_name, "extended_img.tif")
-        cv2.imwrite(extended_img_path, self.img_extended)
-
-
-    def _find_spots_in_rect(self, roi, threshold_adjustment=0, min_range=0, min_dist_from_median=10):
-        self.roi = roi
-        self.roi_mask = None
-        self.roi_polygons = []
-        contours = []
-        x = roi[0]
-        y = roi[1]
-        w = roi[2]
-        h = roi[3]
-        roi_img = self.img_extended[y:y+h, x:x+w]
-        tmp_list = roi_img.flatten().tolist()
-        tmp_list = np.sort(tmp_list)
-        min_val = tmp_list[0]
-        max_val = tmp_list[-1]
-        median_val = tmp_list[int(len(tmp_list)/2)]
-        median_loc = int(100*(median_val-min_val)/(max_val-min_val+1))
-        roi_range = max_val - min_val
-
-        triangle_weight = 0.0
-        thresh_otsu, _ = cv2.threshold(roi_img, 0, 255, cv2.THRESH_BINARY+cv2.THRESH_OTSU)
-        thresh_triangle, _ = cv2.threshold(roi_img, 0, 255, cv2.THRESH_BINARY+cv2.THRESH_TRIANGLE)
-        thresh = int((1.0-triangle_weight)*thresh_otsu+(triangle_weight)*thresh_triangle)
-        thresh = thresh + threshold_adjustment
-        thresh = max(1, min(thresh, 255))
-
-        print(f"    ({x}, {y}, {w}x{h}) {self.img_median=} {median_val=} {roi_range=} {median_loc=} {thresh=} {min_range=} {min_dist_from_median=}")
-        _, roi_mask = cv2.threshold(roi_img, thresh, 255, cv2.THRESH_BINARY)
-
-        if (roi_mask is None) or (not np.any(roi_mask)):
-            return contours, None
-
-        if thresh < self.img_median:
-            return contours, None
-        if roi_range < min_range:
-            return contours, None
-        if (thresh - self.img_median) < min_dist_from_median:
-            return contours, None
-
-        # only include exterior contours
-        self.roi_mask = roi_mask
-        contours, _ = cv2.findContours(image=roi_mask, mode=cv2.RETR_EXTERNAL, method=cv2.CHAIN_APPROX_NONE)
-        polygons = []
-        for contour in contours:
-            contour += (roi[0], roi[1])
-            polygon = pt.contour_to_polygon(contour)
-            polygons.append(polygon)
-
-        return polygons, roi_mask
-
-
-    def set_spot_polygons(self, polygons):
         if self.img is None:
             return False
-        self.spot_polygons = polygons
-        contours = []
-        for polygon in polygons:
-            contours.append(pt.polygon_to_contour(polygon))
+        if not isinstance(polygons, PolygonSet):
+            polygons = PolygonSet.from_polygons(polygons)
+        self._set_spot_polygons(polygons)
         self.spot_mask = np.zeros(self.img.shape, dtype=np.uint8)
-        cv2.drawContours(self.spot_mask, contours, -1, color=255, thickness=cv2.FILLED)
+        cv2.drawContours(self.spot_mask, polygons.to_contours(), -1, color=255, thickness=cv2.FILLED)
+
+
+    def spot_params(self, threshold_adjustment=0, min_range=40, min_dist_from_median=10):
+        '''
+        Returns the vsa_core.SpotParams of the given thresholds with the tile size, quadtree
+        levels, engine and threads set on the processor.
+        '''
+        return core.SpotParams(threshold_adjustment, min_range, min_dist_from_median, self.win_size,
+                               self.quadtree_levels, self.spot_engine, self.spot_threads)
 
 
     def segment_spots_in_roi(self, roi, threshold_adjustment=0, min_range=0, min_dist_from_median=10):
         '''
+        Finds the candidate spots in the region of interest, roi = [x, y, w, h] (see
+        vsa_core.find_spots_in_rect).  The candidates are left in self.roi_polygons, and
+        their mask in self.roi_mask, until they are added with save_roi_spots().
         '''
-        if not self.have_img():
+        if (not self.have_img()) or (self.paper is None):
             return
-        self.roi_polygons, _ = self._find_spots_in_rect(roi, threshold_adjustment, min_range, min_dist_from_median)
+        params = self.spot_params(threshold_adjustment, min_range, min_dist_from_median)
+        self.roi, self.roi_mask, self.roi_polygons = core.find_spots_in_rect(self.paper, roi, params)
         return
 
 
-    def segment_spots(self, threshold_adjustment=0, min_range=40, min_dist_from_median=10):
+    def segment_spots(self, threshold_adjustment=0, min_range=40, min_dist_from_median=10, pix_per_cm=None):
         '''
+        Segments the spots over the whole image (see vsa_core.segment_spots), and sets
+        self.spot_mask and the spot polygons from them.  When tile_size_cm is set and the
+        resolution of the image file, pix_per_cm, is given, win_size is set to tile_size_cm
+        in pixels of img.
         '''
-        win_size = self.win_size
         self.roi_polygons = []
-        self.spot_polygons = []
-        if not self.have_img():
+        self._set_spot_polygons(PolygonSet())
+        if (not self.have_img()) or (self.paper is None):
             return
+        if (self.tile_size_cm is not None) and (pix_per_cm is not None) and (pix_per_cm > 0):
+            self.win_size = max(core.MIN_WIN_SIZE, int(round(self.tile_size_cm * pix_per_cm * self.img_scale)))
 
-        h, w = self.img.shape
+        spots = core.segment_spots(self.paper, self.spot_params(threshold_adjustment, min_range, min_dist_from_median))
+        x, y, w, h = spots.rect
+        self.spot_mask = np.zeros(self.img.shape, dtype=np.uint8)
+        self.spot_mask[y:y+h, x:x+w] = spots.mask
+        if self.artifact_sink.enabled:
+            self._write_artifact("debug_stack.tif", [self.spot_mask, self.img])
 
-        x_count = math.ceil(w / win_size)
-        y_count = math.ceil(h / win_size)
-        tiles = []
-        for y_idx in range(y_count):
-            for x_idx in range(x_count):
-                x1 = x_idx * win_size
-                y1 = y_idx * win_size
-                x2 = min((x1+win_size), w)
-                y2 = min((y1+win_size), h)
-                tiles.append([x1, y1, x2, y2])
-
-        self.spot_mask = np.zeros((h, w))
-        idx = 1
-        for tile in tiles:
-            roi = [tile[0], tile[1], (tile[2]-tile[0]), (tile[3]-tile[1])]
-            _, roi_mask = self._find_spots_in_rect(roi, threshold_adjustment, min_range, min_dist_from_median)
-
-            x1 = tile[0]
-            y1 = tile[1]
-            x2 = tile[2]
-            y2 = tile[3]
-            self.spot_mask[y1:y2, x1:x2] = roi_mask
-
-        self.spot_mask = self.spot_mask.astype(np.uint8)
-        self.spot_mask = np.where(self.paper_mask==0, 0, self.spot_mask)
-        cv2.imwritemulti("debug_stack.tif", [self.spot_mask, self.img])
-        print("debug files: debug_stack.tif")
-
-        self._vectorize_spots()
+        self._set_spot_polygons(spots.polygons)
         return
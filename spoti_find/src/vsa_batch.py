@@ -0,0 +1,427 @@
+# Spoti-find - Copyright (C) 2025 The Jackson Laboratory, Inc.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+
+"""
+Copyright The Jackson Laboratory, 2025
+
+Headless batch processing of many images, without the GUI:
+
+    python -m spoti_find batch IMAGES... --params session.json [--params calibration.json] --output DIR
+
+IMAGES are directories, whose image files are all processed, or glob patterns.
+The parameters are read from JSON files with the keys written by the GUI's
+save_session and save_calibration; later files override earlier ones.  Each
+image is segmented and measured as the GUI does, and the per-sample results
+and the combined summary.csv are written to the output directory, in the
+same formats as the GUI's "Save All".  Nothing here imports Qt.
+
+With --workers N, the images are processed by N worker processes, one per core
+by default.  The parent decodes the images into shared memory for the workers,
+and the summary is written in the order of the images, however they finish.
+
+With --pipeline, the images are read, segmented, measured and written by the
+stages of a Pipeline of threads in one process instead, so reading the next
+images from a slow disk overlaps the processing of the last ones, and the
+busy, waiting and blocked time of every stage is reported.
+"""
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+import multiprocessing
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime
+import numpy as np
+import cv2
+from .vsa import VsaProcessor
+from .area_volume_map import AreaVolumeMap
+from .pipeline import Pipeline, PipelineStage
+from . import vsa_results
+
+IMAGE_EXTENSIONS = ['.tif', '.tiff', '.png', '.jpg', '.jpeg', '.bmp']
+
+# Parameters of a batch, by their session file keys, with the GUI defaults.  A paper
+# threshold of None uses the default threshold of each image.
+DEFAULT_PARAMS = {
+    'micro_void_threshold': 22.0,
+    'nano_void_threshold': 2.0,
+    'min_void_size': 0.1,
+    'paper_threshold': None,
+    'spot_seg_thresh_adj': 0,
+    'spot_seg_min_range': 25,
+    'spot_seg_median_deviation': 10,
+    'cal_pix_per_cm': 1.0,
+    'volume_calibration_data': [],
+}
+
+# The calibration file key for each session file key
+CALIBRATION_KEYS = {'pixels_per_cm': 'cal_pix_per_cm'}
+
+DEFAULT_MOUSE_ID = "mouse_0000"
+
+# Images handed to each worker process at a time, see run_batch()
+IMAGES_PER_WORKER = 2
+
+# Threads reading images ahead, and images queued before each stage, see _run_pipeline()
+PIPELINE_DECODERS = 2
+PIPELINE_QUEUE_SIZE = 4
+
+# Batch state of a worker process, see _init_worker()
+_worker = {}
+
+
+def load_params(filenames):
+    '''
+    Returns the batch parameters, DEFAULT_PARAMS updated from each of the JSON session or
+    calibration files in turn.  Keys that are not parameters, such as the spot polygons of a
+    session, are ignored.
+    '''
+    params = dict(DEFAULT_PARAMS)
+    for filename in filenames:
+        with open(filename, "r") as file:
+            json_dict = json.load(file)
+        for key, value in json_dict.items():
+            key = CALIBRATION_KEYS.get(key, key)
+            if key in params:
+                params[key] = value
+    return params
+
+
+def find_images(inputs):
+    '''
+    Returns the image files of the inputs, each a directory or a glob pattern, in order,
+    sorted within each input, and without repeats.
+    '''
+    filenames = []
+    for path in inputs:
+        if os.path.isdir(path):
+            matches = [os.path.join(path, name) for name in os.listdir(path)
+                       if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS]
+        else:
+            matches = glob.glob(path)
+        for filename in sorted(matches):
+            if os.path.isfile(filename) and (filename not in filenames):
+                filenames.append(filename)
+    return filenames
+
+
+def sample_id_of(filename):
+    ''' The sample id of an image, its file name without the extension, as the GUI sets it. '''
+    return os.path.splitext(os.path.basename(filename))[0]
+
+
+def process_image(filename, params, volume_mapper, img=None):
+    '''
+    Segments the paper and the spots of one image and measures the spots, with the batch
+    parameters.  The image is read from filename, unless it has been read already, img.
+    Returns the VsaProcessor, or None when the image cannot be opened or has no paper.
+    '''
+    processor = segment_image(filename, params, img)
+    if processor is not None:
+        processor.measure_spots(volume_mapper, params['cal_pix_per_cm'], size_thresholds(params))
+    return processor
+
+
+def segment_image(filename, params, img=None):
+    '''
+    Segments the paper and the spots of one image, as process_image() does, without
+    measuring the spots.  The image is reduced to params['analysis_pix_per_cm'] when it
+    is set, and the spots are found by params['spot_engine'], see main().
+    '''
+    processor = VsaProcessor()
+    processor.analysis_pix_per_cm = params.get('analysis_pix_per_cm')
+    processor.spot_engine = params.get('spot_engine', "block")
+    pix_per_cm = params['cal_pix_per_cm']
+    if img is None:
+        opened = processor.open_image(filename, pix_per_cm)
+    else:
+        opened = processor.set_image(img, filename, pix_per_cm)
+    if not opened:
+        return None
+    paper_threshold = params['paper_threshold']
+    if paper_threshold is None:
+        paper_threshold = processor.get_default_paper_threshold()
+    if not processor.segment_paper(paper_threshold):
+        return None
+    processor.segment_spots(params['spot_seg_thresh_adj'], params['spot_seg_min_range'],
+                            params['spot_seg_median_deviation'], pix_per_cm)
+    return processor
+
+
+def size_thresholds(params):
+    ''' The size thresholds of the parameters, [min_void_size, nano_void_thresh, micro_void_thresh]. '''
+    return [params['min_void_size'], params['nano_void_threshold'], params['micro_void_threshold']]
+
+
+def write_sample(output_dir, filename, processor, params, mouse_id=DEFAULT_MOUSE_ID):
+    '''
+    Writes the per-sample results file of the image, named as the GUI's "Save All" names it,
+    and returns its summary record.
+    '''
+    sample_id = sample_id_of(filename)
+    date_time = datetime.now().strftime("%Y/%m/%d:%H:%M:%S")
+    csv_data = vsa_results.sample_rows(processor.spot_table, sample_id, mouse_id, date_time, filename)
+    vsa_results.write_csv(os.path.join(output_dir, f"{mouse_id}_{sample_id}_sample.csv"), csv_data)
+    return vsa_results.summary_record(processor.spot_table, sample_id, mouse_id, date_time,
+                                      processor.get_paper_area(), size_thresholds(params))
+
+
+def write_summary(summary_filename, records):
+    '''
+    Adds the summary records to the summary file, replacing the records of the same samples
+    that it already holds, or creates the file.
+    '''
+    try:
+        csv_data = vsa_results.read_csv(summary_filename)
+    except OSError:
+        csv_data = [vsa_results.SUMMARY_HEADING]
+    sample_ids = set(record[0] for record in records)
+    csv_data = [record for record in csv_data if record[0] not in sample_ids]
+    vsa_results.write_csv(summary_filename, csv_data + records)
+
+
+def _process_sample(idx, filename, params, volume_mapper, output_dir, img=None):
+    '''
+    Processes one image of a batch and writes its per-sample results file.  Returns
+    (idx, summary record or None, message, process id, busy seconds).
+    '''
+    start = time.perf_counter()
+    record = None
+    try:
+        processor = process_image(filename, params, volume_mapper, img)
+        if processor is None:
+            message = "could not be segmented"
+        else:
+            record = write_sample(output_dir, filename, processor, params)
+            message = f"{len(processor.spot_table)} spots"
+    except Exception as error:
+        message = str(error)
+    busy = time.perf_counter() - start
+    return idx, record, message, os.getpid(), busy
+
+
+def _init_worker(params, output_dir):
+    ''' Sets up a worker process of a parallel batch, which runs one image at a time on one core. '''
+    cv2.setNumThreads(1)
+    volume_mapper = AreaVolumeMap()
+    volume_mapper.compute_model(params['volume_calibration_data'])
+    _worker.update(params=params, output_dir=output_dir, volume_mapper=volume_mapper)
+
+
+def _process_shared(idx, filename, shm_name, shape, dtype):
+    '''
+    Processes one image of a parallel batch in a worker process.  The image decoded by the
+    parent is read from the shared memory block shm_name, which the parent owns and unlinks.
+    '''
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        img = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        result = _process_sample(idx, filename, _worker['params'], _worker['volume_mapper'], _worker['output_dir'], img)
+        del img
+    finally:
+        shm.close()
+    return result
+
+
+def _run_parallel(filenames, params, output_dir, workers, on_result):
+    '''
+    Runs the batch on a pool of worker processes.  The parent decodes each image into a
+    shared memory block, so the pixels are not pickled, and keeps IMAGES_PER_WORKER images
+    per worker in flight.  on_result is called with each result as it arrives, in the order
+    the images finish.
+    '''
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker, initargs=(params, output_dir)) as pool:
+        pending = {}    # future -> shared memory block
+        next_idx = 0
+        try:
+            while (next_idx < len(filenames)) or pending:
+                while (next_idx < len(filenames)) and (len(pending) < workers*IMAGES_PER_WORKER):
+                    idx, filename = next_idx, filenames[next_idx]
+                    next_idx += 1
+                    img = cv2.imread(filename, cv2.IMREAD_GRAYSCALE)
+                    if (img is None) or (img.size == 0):
+                        on_result((idx, None, "could not be read", os.getpid(), 0.0))
+                        continue
+                    shm = shared_memory.SharedMemory(create=True, size=img.nbytes)
+                    np.ndarray(img.shape, dtype=img.dtype, buffer=shm.buf)[...] = img
+                    future = pool.submit(_process_shared, idx, filename, shm.name, img.shape, img.dtype.str)
+                    pending[future] = shm
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    shm = pending.pop(future)
+                    shm.close()
+                    shm.unlink()
+                    on_result(future.result())
+        finally:
+            for future, shm in pending.items():
+                future.cancel()
+                shm.close()
+                shm.unlink()
+
+
+def _run_pipeline(filenames, params, output_dir, threads, on_result):
+    '''
+    Runs the batch on a Pipeline in this process: PIPELINE_DECODERS threads read the images
+    ahead, threads threads segment them and as many measure their spots, and one thread
+    writes the per-sample results files, with PIPELINE_QUEUE_SIZE images queued before each
+    stage.
+    Each image passes from stage to stage with its VsaProcessor, so the stages share nothing
+    else.  An image that fails skips the stages after it.  on_result is called with each
+    result, in the order the images finish.  Returns the PipelineStages.
+    '''
+    volume_mapper = AreaVolumeMap()
+    volume_mapper.compute_model(params['volume_calibration_data'])
+
+    def step(func):
+        def run(sample):
+            if sample['message'] is None:
+                start = time.perf_counter()
+                try:
+                    func(sample)
+                except Exception as error:
+                    sample['message'] = str(error)
+                sample['busy'] += time.perf_counter() - start
+            return sample
+        return run
+
+    def decode(sample):
+        img = cv2.imread(sample['filename'], cv2.IMREAD_GRAYSCALE)
+        if (img is None) or (img.size == 0):
+            sample['message'] = "could not be read"
+        sample['img'] = img
+
+    def segment(sample):
+        sample['processor'] = segment_image(sample['filename'], params, sample.pop('img'))
+        if sample['processor'] is None:
+            sample['message'] = "could not be segmented"
+
+    def measure(sample):
+        sample['processor'].measure_spots(volume_mapper, params['cal_pix_per_cm'], size_thresholds(params))
+
+    def write(sample):
+        processor = sample.pop('processor')
+        sample['record'] = write_sample(output_dir, sample['filename'], processor, params)
+        sample['message'] = f"{len(processor.spot_table)} spots"
+
+    stages = [PipelineStage("decode", step(decode), PIPELINE_DECODERS, PIPELINE_QUEUE_SIZE),
+              PipelineStage("segment", step(segment), threads, PIPELINE_QUEUE_SIZE),
+              PipelineStage("measure", step(measure), threads, PIPELINE_QUEUE_SIZE),
+              PipelineStage("write", step(write), 1, PIPELINE_QUEUE_SIZE)]
+    samples = ({'idx': idx, 'filename': filename, 'record': None, 'message': None, 'busy': 0.0}
+               for idx, filename in enumerate(filenames))
+    Pipeline(stages).run(samples, lambda sample: on_result((sample['idx'], sample['record'], sample['message'],
+                                                            os.getpid(), sample['busy'])))
+    return stages
+
+
+def run_batch(filenames, params, output_dir, log=print, workers=1, pipeline=False):
+    '''
+    Processes the images, on workers processes when workers is above 1, writing each
+    per-sample results file as it is done and the summary file at the end, also when the
+    run is interrupted.  The summary records are in the order of filenames, however the
+    images finish.  Images that fail are reported and skipped.  With pipeline set, the
+    images are processed by the stages of a Pipeline of threads instead, with workers
+    segmentation threads (see _run_pipeline).
+
+    Returns (processed count, failed file names, elapsed seconds, statistics), where the
+    statistics are {process id: (images, busy seconds)} of the workers, or the
+    PipelineStages with pipeline set.
+    '''
+    os.makedirs(output_dir, exist_ok=True)
+    results = {}
+    failed = {}
+    worker_stats = {}
+
+    def on_result(result):
+        idx, record, message, pid, busy = result
+        if record is None:
+            failed[idx] = filenames[idx]
+        else:
+            results[idx] = record
+            images, total = worker_stats.get(pid, (0, 0.0))
+            worker_stats[pid] = (images + 1, total + busy)
+        log(f"[{idx+1}/{len(filenames)}] {filenames[idx]}: {message}, {busy*1000:.0f} ms")
+
+    start = time.perf_counter()
+    try:
+        if pipeline:
+            worker_stats = _run_pipeline(filenames, params, output_dir, workers, on_result)
+        elif workers > 1:
+            _run_parallel(filenames, params, output_dir, workers, on_result)
+        else:
+            volume_mapper = AreaVolumeMap()
+            volume_mapper.compute_model(params['volume_calibration_data'])
+            for idx, filename in enumerate(filenames):
+                on_result(_process_sample(idx, filename, params, volume_mapper, output_dir))
+    finally:
+        if results:
+            write_summary(os.path.join(output_dir, "summary.csv"), [results[idx] for idx in sorted(results)])
+    failed = [failed[idx] for idx in sorted(failed)]
+    return len(results), failed, time.perf_counter() - start, worker_stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m spoti_find batch",
+                                     description="Segment and measure the void spots of many images without the GUI.")
+    parser.add_argument("images", nargs="+", help="directories of images, or glob patterns of image files")
+    parser.add_argument("--params", action="append", default=[], metavar="JSON",
+                        help="session or calibration file, as saved by the GUI; may be repeated, later files override earlier ones")
+    parser.add_argument("--output", required=True, metavar="DIR", help="directory of the results files")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, metavar="N",
+                        help="number of worker processes, one per core by default, or of segmentation threads with --pipeline")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="read, segment, measure and write the images on separate threads of one process")
+    parser.add_argument("--analysis-pix-per-cm", type=float, default=None, metavar="PIX_PER_CM",
+                        help="reduce each image to this resolution before segmenting it, when it is below the "
+                             "calibrated resolution of the file; faster, but the spot volumes drift, by 32%% to 50%% "
+                             "on average on the Validation images at 40 to 20 px/cm, as spots split or merge; "
+                             "off by default")
+    parser.add_argument("--spot-engine", choices=["block", "tile", "niblack", "sauvola"], default="block",
+                        help="spot segmentation: block or tile, the GUI's tiled thresholds, with the same result; "
+                             "niblack and sauvola are experimental local thresholds, which agree poorly with the "
+                             "tiled thresholds (Dice about 0.5 on the Validation images), over- or under-segment "
+                             "the spots, and find spots in paper texture where there are none (see "
+                             "vsa_core.local_spot_mask); default block")
+    parser.add_argument("--quiet", action="store_true", help="only report the totals")
+    args = parser.parse_args(argv)
+
+    params = load_params(args.params)
+    params['analysis_pix_per_cm'] = args.analysis_pix_per_cm
+    params['spot_engine'] = args.spot_engine
+    filenames = find_images(args.images)
+    if len(filenames) == 0:
+        print("no images found", file=sys.stderr)
+        return 1
+    log = (lambda message: None) if args.quiet else print
+    workers = max(1, min(args.workers, len(filenames)))
+    count, failed, elapsed, stats = run_batch(filenames, params, args.output, log, workers, args.pipeline)
+    rate = count / elapsed if elapsed > 0 else 0.0
+    if args.pipeline:
+        print(f"{count} of {len(filenames)} images processed in {elapsed:.1f} s, {rate:.2f} images/s, pipeline")
+        for stage in stats:
+            print(f"    {stage.report(elapsed)}")
+    else:
+        print(f"{count} of {len(filenames)} images processed in {elapsed:.1f} s, {rate:.2f} images/s, {workers} worker(s)")
+        for pid, (images, busy) in sorted(stats.items()):
+            print(f"    worker {pid}: {images} images, {images/elapsed:.2f} images/s, utilization {busy/elapsed*100:.0f}%")
+    for filename in failed:
+        print(f"failed: {filename}", file=sys.stderr)
+    return 0 if len(failed) == 0 else 1
@@ -0,0 +1,786 @@
+# Spoti-find - Copyright (C) 2025 The Jackson Laboratory, Inc.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+
+"""
+Copyright The Jackson Laboratory, 2025
+
+The stages of the voided spot analysis as functions.  Each stage takes the image,
+the results of the stages before it and its parameters, and returns its results
+as a tuple whose arrays are read-only.  Nothing is kept between calls, so the
+stages of any number of images can run at once, on any threads, and their results
+can be cached and shared.  VsaProcessor holds the results of one image for the GUI.
+"""
+import math
+import logging
+from typing import NamedTuple
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import cv2
+from . import polygon_tools as pt
+from . import tile_stats as ts
+from .polygon import PolygonSet
+from .spot_table import SpotTable
+
+logger = logging.getLogger(__name__)
+
+# Smallest spot tile, in pixels, when the tile size is set in cm
+MIN_WIN_SIZE = 16
+
+# Local threshold engines, see local_spot_mask().  These are untuned starting values: no
+# values of k and R tried bring the masks close to the tiled engines (see its docstring).
+NIBLACK_K = 0.25
+SAUVOLA_K = 0.05
+SAUVOLA_R = 32.0
+LOCAL_STRIP_ROWS = 256
+
+# Batches of tiles per thread of the "tile" spot engine, see tile_spot_mask()
+TILE_BATCHES_PER_THREAD = 4
+
+# Pixel measurements of each spot, see measure_spot_geometry(), and their types
+GEOMETRY_COLUMNS = {'img_x': np.int64, 'img_y': np.int64, 'img_w': np.int64, 'img_h': np.int64,
+                    'perimeter_pix': np.float64, 'area_pix2': np.float64, 'circularity': np.float64,
+                    'pixel_count': np.int64, 'intensity_sum': np.float64, 'ave_dist_to_edge_pix': np.float64}
+
+
+class Paper(NamedTuple):
+    ''' The paper found by segment_paper(). '''
+    mask: np.ndarray        # 255 on the paper, 0 elsewhere, the size of the image
+    polygon: list           # outline of the paper, [[x, y], ...]
+    bbox: tuple             # (x, y, w, h) of polygon
+    crop: tuple             # (x, y, w, h) of the region processed, see tile_crop()
+    hist: np.ndarray        # histogram of the image within mask and crop
+    median: int             # median of the paper, ignoring pixels of 0
+    extended: np.ndarray    # image within crop, with the median off the paper
+
+
+class DistMap(NamedTuple):
+    ''' Distance to the edge of the paper, see dist_map(). '''
+    map: np.ndarray         # float32 distances, over the bounding box of the paper
+    origin: tuple           # image coordinates of map[0, 0]
+
+
+class SpotParams(NamedTuple):
+    ''' Parameters of the spot segmentation, see segment_spots(). '''
+    threshold_adjustment: int = 0
+    min_range: int = 40
+    min_dist_from_median: int = 10
+    win_size: int = 100         # spot tile size in pixels
+    quadtree_levels: int = 3    # levels above the win_size tiles in the candidate quadtree
+    engine: str = "block"       # "block", "tile", "niblack" or "sauvola"
+    threads: int = 1            # threads thresholding the tiles of the "tile" engine
+
+
+class Spots(NamedTuple):
+    ''' The spots found by segment_spots(). '''
+    rect: tuple             # (x, y, w, h) of the region segmented
+    mask: np.ndarray        # 255 on the spots, over rect
+    polygons: PolygonSet    # external contours of the spots, in image coordinates
+
+
+class RoiSpots(NamedTuple):
+    ''' The spots found by find_spots_in_rect(). '''
+    roi: list               # [x, y, w, h] of the region of interest
+    mask: np.ndarray        # 255 on the spots, over roi, or None when the region is rejected
+    polygons: list          # spot polygons, [[x, y], ...], in image coordinates
+
+
+def _frozen(array):
+    ''' Makes array read-only and returns it. '''
+    if array is not None:
+        array.setflags(write=False)
+    return array
+
+
+def reduce_image(img, pix_per_cm, analysis_pix_per_cm):
+    '''
+    Reduces the image of resolution pix_per_cm to analysis_pix_per_cm, with area
+    interpolation, when both are given and analysis_pix_per_cm is the lower.  Returns the
+    image, reduced or not, and its pixels per pixel of img.
+    '''
+    if (analysis_pix_per_cm is None) or (pix_per_cm is None) or not (0 < analysis_pix_per_cm < pix_per_cm):
+        return img, 1.0
+    img_scale = analysis_pix_per_cm / pix_per_cm
+    h, w = img.shape
+    size = (max(1, int(round(w*img_scale))), max(1, int(round(h*img_scale))))
+    return cv2.resize(img, size, interpolation=cv2.INTER_AREA), img_scale
+
+
+def default_paper_threshold(img, hist):
+    '''
+    The default threshold for segmentation of the paper from the background is a weighted
+    average of thresholds computed from the triangle and Otsu methods, with the triangle
+    threshold given a weight of 0.75.  Both thresholds come from hist, the image histogram.
+    '''
+    triangle_weight = 0.75
+    thresh_otsu = int(ts.otsu_threshold(hist))
+    # OpenCV built with IPP breaks near ties differently, so those are left to OpenCV
+    if ts.otsu_ambiguous(hist):
+        thresh_otsu, _ = cv2.threshold(img, 0, 255, cv2.THRESH_BINARY+cv2.THRESH_OTSU)
+    thresh_triangle = int(ts.triangle_threshold(hist))
+    thresh = int((1.0-triangle_weight)*thresh_otsu+(triangle_weight)*thresh_triangle)
+
+    thresh = max(thresh, 0)
+    thresh = min(thresh, 255)
+    return int(thresh)
+
+
+def threshold_paper(img, threshold, check_empty=True):
+    '''
+    Thresholds the paper and removes specks and threads with a 3x3 opening.  Returns None
+    when nothing is above the threshold and check_empty is set.
+    '''
+    _, paper_mask = cv2.threshold(img, threshold, 255, cv2.THRESH_BINARY)
+    if check_empty and ((paper_mask is None) or (not np.any(paper_mask))):
+        return None
+    kernel = np.ones((3,3), np.uint8)
+    paper_mask = cv2.erode(paper_mask, kernel, iterations=1)
+    paper_mask = cv2.dilate(paper_mask, kernel, iterations=1)
+    return paper_mask
+
+
+def _window_sums(integral, first, last, w, side):
+    '''
+    Returns the sums over the side x side windows whose top left corners are at rows
+    first:last and columns 0:w of the image of the integral image.
+    '''
+    return (integral[first+side:last+side, side:w+side] - integral[first:last, side:w+side]
+            - integral[first+side:last+side, 0:w] + integral[first:last, 0:w])
+
+
+def _side_distances(xs, ys, start, side):
+    '''
+    Returns the distance from each point (xs[i], ys[i]) to each line segment from start[j]
+    to start[j]+side[j], as an array indexed [i, j].
+    '''
+    side_len2 = (side*side).sum(axis=1)
+    side_len2[side_len2 == 0] = 1.0
+    px = xs[:, None] - start[:, 0]
+    py = ys[:, None] - start[:, 1]
+    t = np.clip((px*side[:, 0] + py*side[:, 1]) / side_len2, 0.0, 1.0)
+    ex = px - t*side[:, 0]
+    ey = py - t*side[:, 1]
+    return np.sqrt(ex*ex + ey*ey)
+
+
+def paper_contour(img, threshold, pyramid_scale=1):
+    '''
+    Returns the contour of the paper, the largest region of the image above the threshold,
+    or None when there is none.  When pyramid_scale is above 1, the paper is found on the
+    minima and maxima of blocks of that size first (see _paper_contour_pyramid).
+    '''
+    if pyramid_scale > 1:
+        return _paper_contour_pyramid(img, threshold, pyramid_scale)
+    paper_mask = threshold_paper(img, threshold)
+    if paper_mask is None:
+        return None
+    paper_contours, _ = cv2.findContours(image=paper_mask, mode=cv2.RETR_EXTERNAL, method=cv2.CHAIN_APPROX_NONE)
+    if len(paper_contours) == 0:
+        return None
+    return paper_contours[pt.largest_contour(paper_contours)]
+
+
+def _paper_contour_pyramid(img, threshold, scale):
+    '''
+    Segments the paper on a coarse image of the minimum and maximum of each scale x scale
+    block, then thresholds again at full resolution only the blocks whose result the coarse
+    image leaves open.  The paper is the largest region of the combined mask, which is the
+    mask threshold_paper() makes of the whole image.
+
+    The opening of threshold_paper() reaches two pixels, so a block that lies, with the
+    eight blocks around it, entirely above the threshold is paper after the opening, and
+    one that lies entirely at or below it is background.  Every other block, those on the
+    edges of the paper and those holding a gap or a speck of any size, is thresholded at
+    full resolution, a group of blocks at a time.  The mask is therefore always that of
+    full resolution, whatever the width of the gaps in it.
+
+    The block minima and maxima still read the whole image, and the noisy background of a
+    scan leaves many blocks open, so on the Validation images this is slower than
+    segmenting at full resolution (see the "paper" benchmark in bench_vsa), and
+    pyramid_scale stays 1 by default.
+    '''
+    img_h, img_w = img.shape
+    # With the anchor at the corner, each block's minimum and maximum land on its first pixel
+    block_kernel = np.ones((scale, scale), np.uint8)
+    block_min = cv2.erode(img, block_kernel, anchor=(0, 0))[::scale, ::scale]
+    block_max = cv2.dilate(img, block_kernel, anchor=(0, 0))[::scale, ::scale]
+    if not np.any(block_max > threshold):
+        return None
+    kernel = np.ones((3,3), np.uint8)
+    # The erosion ignores the image border, as the opening at full resolution does
+    above = cv2.erode(np.where(block_min > threshold, 255, 0).astype(np.uint8), kernel)
+    below = cv2.erode(np.where(block_max <= threshold, 255, 0).astype(np.uint8), kernel)
+    blocks_h, blocks_w = above.shape
+    paper_mask = cv2.resize(above, (blocks_w*scale, blocks_h*scale), interpolation=cv2.INTER_NEAREST)
+    paper_mask = np.ascontiguousarray(paper_mask[:img_h, :img_w])
+
+    # The blocks left open, in groups of group_cells x group_cells blocks
+    group_cells = 16
+    group_size = group_cells * scale
+    _, open_groups = ts.tile_min_max(cv2.bitwise_not(cv2.bitwise_or(above, below)), group_cells)
+    for y_idx, x_idx in zip(*np.nonzero(open_groups)):
+        x1, y1 = x_idx * group_size, y_idx * group_size
+        x2, y2 = min(x1 + group_size, img_w), min(y1 + group_size, img_h)
+        # The opening reaches two pixels, so a margin of two makes the group exact
+        mx1, my1 = max(x1-2, 0), max(y1-2, 0)
+        mx2, my2 = min(x2+2, img_w), min(y2+2, img_h)
+        group_mask = threshold_paper(img[my1:my2, mx1:mx2], threshold, check_empty=False)
+        paper_mask[y1:y2, x1:x2] = group_mask[y1-my1:y2-my1, x1-mx1:x2-mx1]
+
+    paper_contours, _ = cv2.findContours(image=paper_mask, mode=cv2.RETR_EXTERNAL, method=cv2.CHAIN_APPROX_NONE)
+    if len(paper_contours) == 0:
+        return None
+    return paper_contours[pt.largest_contour(paper_contours)]
+
+
+def tile_crop(bbox, win_size, shape):
+    '''
+    Returns the region that the spots are segmented in, (x, y, w, h): the bounding box of
+    the paper, bbox, grown out to the edges of the win_size tiles, so that the tiles of the
+    region are tiles of the whole image, of the given shape.
+    '''
+    x, y, w, h = bbox
+    img_h, img_w = shape
+    x1 = (x // win_size) * win_size
+    y1 = (y // win_size) * win_size
+    x2 = min(math.ceil((x+w) / win_size) * win_size, img_w)
+    y2 = min(math.ceil((y+h) / win_size) * win_size, img_h)
+    return (x1, y1, x2-x1, y2-y1)
+
+
+def extend_image(img, paper_mask, crop):
+    '''
+    This function computes the median value of the image in the paper mask area.  This value is then
+    written to all pixels in the original image, outside the paper mask.  The median is read from the
+    histogram of the paper, ignoring pixels with a value of 0.  Only the region around the paper, crop,
+    is extended; the rest of the image would only hold the median (see extended_region).
+
+    Note: it may be better to set the value of the background pixels to the value closest in the mask.
+
+    returns:
+        (hist, median, extended), the histogram of the paper within crop, its median, and
+        the extended image over crop
+    '''
+    x, y, w, h = crop
+    img = img[y:y+h, x:x+w]
+    paper_mask = paper_mask[y:y+h, x:x+w]
+    paper_hist = ts.histogram(img, paper_mask)
+    hist = paper_hist.copy()
+    hist[0] = 0
+    median = ts.median(hist)
+    extended = np.full_like(img, int(median))
+    cv2.copyTo(img, paper_mask, extended)
+    return paper_hist, median, extended
+
+
+def segment_paper(img, threshold, pyramid_scale=1, win_size=100):
+    '''
+    Segments the paper from the background with the fixed threshold (see paper_contour),
+    and extends the image around it for the spot segmentation.  Returns the Paper, or None
+    when no paper is found.
+    '''
+    contour = paper_contour(img, threshold, pyramid_scale)
+    if contour is None:
+        return None
+    paper_mask = np.zeros(img.shape, dtype=np.uint8)
+    cv2.drawContours(paper_mask, [contour], -1, color=255, thickness=cv2.FILLED)
+    bbox = cv2.boundingRect(contour)
+    crop = tile_crop(bbox, win_size, img.shape)
+    paper_hist, median, extended = extend_image(img, paper_mask, crop)
+    return Paper(_frozen(paper_mask), pt.contour_to_polygon(contour), bbox, crop,
+                 _frozen(paper_hist), median, _frozen(extended))
+
+
+def dist_map(paper):
+    '''
+    Returns the DistMap of the distance from each pixel of the paper to the nearest pixel
+    off the paper, as float32.  The map covers only the bounding box of the paper, with a
+    one pixel margin where the image allows.
+    '''
+    x, y, w, h = paper.bbox
+    img_h, img_w = paper.mask.shape
+    # The margin of background makes the cropped transform equal to that of the whole image
+    x1, y1 = max(x-1, 0), max(y-1, 0)
+    x2, y2 = min(x+w+1, img_w), min(y+h+1, img_h)
+    return DistMap(_frozen(cv2.distanceTransform(paper.mask[y1:y2, x1:x2], cv2.DIST_L2, 3)), (x1, y1))
+
+
+def map_edge_distances(distances, xs, ys):
+    '''
+    Returns the distance to the edge of the paper of the pixels at (xs, ys), as float32,
+    from the DistMap distances, with 0 for pixels off the paper.
+    '''
+    dist = np.zeros(len(xs), dtype=np.float32)
+    if distances is None:
+        return dist
+    xs = xs - distances.origin[0]
+    ys = ys - distances.origin[1]
+    h, w = distances.map.shape
+    on_map = (xs >= 0) & (xs < w) & (ys >= 0) & (ys < h)
+    dist[on_map] = distances.map[ys[on_map], xs[on_map]]
+    return dist
+
+
+def polygon_edge_distances(paper, xs, ys, tile_size=32):
+    '''
+    Computes the distance from the pixels at (xs, ys) to the polygon of the paper, simplified
+    to within half a pixel.  One is added so that, as in the distance map, the pixels on the
+    edge of the paper are at a distance of 1.  Pixels off the paper are at 0.
+
+    The pixels are taken a tile at a time, and each tile is only compared with the sides
+    of the polygon that can be nearest to some point of it: those no farther from the tile
+    than the smallest distance within which a side lies of all of the tile.
+    '''
+    dist = np.zeros(len(xs), dtype=np.float32)
+    if (len(xs) == 0) or (paper is None) or (len(paper.polygon) == 0):
+        return dist
+    contour = np.array(paper.polygon, dtype=np.int32).reshape(-1, 1, 2)
+    start = cv2.approxPolyDP(contour, 0.5, True).reshape(-1, 2).astype(np.float64)
+    side = np.roll(start, -1, axis=0) - start
+    side_low = np.minimum(start, start + side)
+    side_high = np.maximum(start, start + side)
+
+    tile_idx = (ys // tile_size) * (xs.max() // tile_size + 1) + xs // tile_size
+    order = np.argsort(tile_idx, kind='stable')
+    bounds = np.flatnonzero(np.diff(tile_idx[order])) + 1
+    for pixels in np.split(order, bounds):
+        x1, y1 = (xs[pixels[0]] // tile_size) * tile_size, (ys[pixels[0]] // tile_size) * tile_size
+        x2, y2 = x1 + tile_size - 1, y1 + tile_size - 1
+        # The distance to a side is convex, so its largest value over the tile is at a corner
+        corners = np.array([[x1, y1], [x2, y1], [x1, y2], [x2, y2]], dtype=np.float64)
+        reach = _side_distances(corners[:, 0], corners[:, 1], start, side).max(axis=0).min()
+        gap_x = np.maximum(np.maximum(side_low[:, 0] - x2, x1 - side_high[:, 0]), 0.0)
+        gap_y = np.maximum(np.maximum(side_low[:, 1] - y2, y1 - side_high[:, 1]), 0.0)
+        near = gap_x*gap_x + gap_y*gap_y <= reach*reach
+        side_dist = _side_distances(xs[pixels], ys[pixels], start[near], side[near])
+        dist[pixels] = side_dist.min(axis=1) + 1.0
+    dist[paper.mask[ys, xs] == 0] = 0.0
+    return dist
+
+
+def extended_region(paper, x, y, w, h):
+    '''
+    Returns the extended image over the rectangle (x, y, w, h), clipped to the image.  This
+    is a view of paper.extended when the rectangle is within paper.crop, and otherwise a
+    copy with the median of the paper outside of paper.crop.
+    '''
+    img_h, img_w = paper.mask.shape
+    x1, y1 = max(x, 0), max(y, 0)
+    x2, y2 = max(min(x+w, img_w), x1), max(min(y+h, img_h), y1)
+    cx, cy, cw, ch = paper.crop
+    if (cx <= x1) and (cy <= y1) and (x2 <= cx+cw) and (y2 <= cy+ch):
+        return paper.extended[y1-cy:y2-cy, x1-cx:x2-cx]
+    region = np.full((y2-y1, x2-x1), int(paper.median), dtype=paper.extended.dtype)
+    ox1, oy1 = max(x1, cx), max(y1, cy)
+    ox2, oy2 = min(x2, cx+cw), min(y2, cy+ch)
+    if (ox1 < ox2) and (oy1 < oy2):
+        region[oy1-y1:oy2-y1, ox1-x1:ox2-x1] = paper.extended[oy1-cy:oy2-cy, ox1-cx:ox2-cx]
+    return region
+
+
+def spot_thresholds(paper, hists, region_img, params):
+    '''
+    Computes the spot threshold of each region from its histogram, and whether the
+    region is accepted as containing spots.  A region is rejected when nothing is above
+    the threshold, when its range of values is less than min_range, or when the threshold
+    is not at least min_dist_from_median above the median of the paper.
+
+    Parameters:
+        hists - array of 256-bin histograms, one per region
+        region_img - function returning the pixels of the region at a given index of hists
+    returns:
+        (thresholds, accepted) arrays with the leading shape of hists
+    '''
+    min_val, max_val, _ = ts.min_max_median(hists)
+    roi_range = max_val - min_val
+
+    triangle_weight = 0.0
+    thresh_otsu = ts.otsu_threshold(hists)
+    # OpenCV built with IPP breaks near ties differently, so those regions are left to OpenCV
+    for idx in zip(*np.nonzero(ts.otsu_ambiguous(hists))):
+        thresh_otsu[idx], _ = cv2.threshold(region_img(idx), 0, 255, cv2.THRESH_BINARY+cv2.THRESH_OTSU)
+    thresh_triangle = ts.triangle_threshold(hists)
+    thresh = ((1.0-triangle_weight)*thresh_otsu+(triangle_weight)*thresh_triangle).astype(int)
+    thresh = np.clip(thresh + params.threshold_adjustment, 1, 255)
+
+    accept = max_val > thresh
+    accept &= thresh >= paper.median
+    accept &= roi_range >= params.min_range
+    accept &= (thresh - paper.median) >= params.min_dist_from_median
+    return thresh, accept
+
+
+def threshold_rect(paper, roi, params):
+    '''
+    Thresholds the region of interest, roi = [x, y, w, h], of the extended image.  All of
+    the statistics used to pick and accept the threshold come from a single histogram of
+    the region.  Returns the region mask, or None when the region is rejected.  The
+    statistics are logged at DEBUG level.
+    '''
+    x = roi[0]
+    y = roi[1]
+    w = roi[2]
+    h = roi[3]
+    roi_img = extended_region(paper, x, y, w, h)
+    if roi_img.size == 0:
+        return None
+    hist = ts.histogram(roi_img)[np.newaxis]
+    min_val, max_val, median_val = (int(v[0]) for v in ts.min_max_median(hist))
+    median_loc = int(100*(median_val-min_val)/(max_val-min_val+1))
+    roi_range = max_val - min_val
+
+    thresh, accept = spot_thresholds(paper, hist, lambda idx: roi_img, params)
+    thresh = int(thresh[0])
+
+    logger.debug("(%d, %d, %dx%d) img_median=%d median_val=%d roi_range=%d median_loc=%d thresh=%d min_range=%d min_dist_from_median=%d",
+                 x, y, w, h, paper.median, median_val, roi_range, median_loc, thresh, params.min_range, params.min_dist_from_median)
+    if not accept[0]:
+        return None
+    _, roi_mask = cv2.threshold(roi_img, thresh, 255, cv2.THRESH_BINARY)
+    return roi_mask
+
+
+def find_spots_in_rect(paper, roi, params):
+    '''
+    Thresholds the region of interest, roi = [x, y, w, h], of the extended image (see
+    threshold_rect), and returns the RoiSpots found in it.
+    '''
+    roi_mask = threshold_rect(paper, roi, params)
+    if roi_mask is None:
+        return RoiSpots(roi, None, [])
+
+    # only include exterior contours
+    contours, _ = cv2.findContours(image=roi_mask, mode=cv2.RETR_EXTERNAL, method=cv2.CHAIN_APPROX_NONE)
+    polygons = []
+    for contour in contours:
+        contour += (roi[0], roi[1])
+        polygon = pt.contour_to_polygon(contour)
+        polygons.append(polygon)
+    return RoiSpots(roi, _frozen(roi_mask), polygons)
+
+
+def spot_candidates(paper, rect, params):
+    '''
+    Finds the win_size tiles of the region rect = (x, y, w, h) that may hold spots, with a
+    quadtree over the ranges of values of the tiles.  Starting from tiles quadtree_levels
+    levels above win_size, a tile is rejected when it has no paper, when its range of values
+    is less than min_range, or when its maximum is not more than min_dist_from_median above
+    the median of the paper.  Only the quarters of the tiles that are not rejected are
+    tested at the level below.  No tile rejected here can pass the tests of spot_thresholds,
+    so the candidates are the only tiles that need to be thresholded.
+
+    returns:
+        (candidates, tested), a boolean array over the win_size tiles and the number of
+        quadtree tiles tested
+    '''
+    x, y, w, h = rect
+    tile_min, tile_max = ts.tile_min_max(extended_region(paper, *rect), params.win_size)
+    _, paper_max = ts.tile_min_max(paper.mask[y:y+h, x:x+w], params.win_size)
+    levels = [(tile_min, tile_max, paper_max)]
+    for _ in range(params.quadtree_levels):
+        tile_min, tile_max, paper_max = levels[-1]
+        levels.append((ts.merge_quadrants(tile_min, np.minimum), ts.merge_quadrants(tile_max, np.maximum),
+                       ts.merge_quadrants(paper_max, np.maximum)))
+
+    spot_floor = paper.median + max(params.min_dist_from_median, 0)
+    candidates = None
+    tested = 0
+    for tile_min, tile_max, paper_max in reversed(levels):
+        passed = (paper_max > 0) & ((tile_max.astype(int) - tile_min) >= params.min_range) & (tile_max > spot_floor)
+        if candidates is not None:
+            quarters = np.repeat(np.repeat(candidates, 2, axis=0), 2, axis=1)[:passed.shape[0], :passed.shape[1]]
+            passed &= quarters
+            tested += np.count_nonzero(quarters)
+        else:
+            tested += passed.size
+        candidates = passed
+    return candidates, tested
+
+
+def tile_spot_mask(paper, rect, params):
+    '''
+    Builds the spot mask of the region rect = (x, y, w, h) by thresholding each candidate
+    tile on its own (see threshold_rect).  When params.threads is above 1, the tiles are
+    thresholded in batches on a pool of that many threads; OpenCV releases the GIL while
+    it works.  The tile masks are stitched in the order of the tiles in both cases, so the
+    mask does not depend on the number of threads.
+    '''
+    win_size = params.win_size
+    rect_x, rect_y, w, h = rect
+    candidates, _ = spot_candidates(paper, rect, params)
+
+    tiles = []
+    for y_idx, x_idx in zip(*np.nonzero(candidates)):
+        x1 = x_idx * win_size
+        y1 = y_idx * win_size
+        x2 = min((x1+win_size), w)
+        y2 = min((y1+win_size), h)
+        tiles.append([x1, y1, x2, y2])
+
+    def threshold_tiles(batch):
+        masks = []
+        for tile in batch:
+            roi = [rect_x+tile[0], rect_y+tile[1], (tile[2]-tile[0]), (tile[3]-tile[1])]
+            masks.append(threshold_rect(paper, roi, params))
+        return masks
+
+    if (params.threads > 1) and (len(tiles) > 1):
+        batch_size = max(1, -(-len(tiles) // (params.threads*TILE_BATCHES_PER_THREAD)))
+        batches = [tiles[start:start+batch_size] for start in range(0, len(tiles), batch_size)]
+        with ThreadPoolExecutor(params.threads) as pool:
+            tile_masks = [mask for masks in pool.map(threshold_tiles, batches) for mask in masks]
+    else:
+        tile_masks = threshold_tiles(tiles)
+
+    spot_mask = np.zeros((h, w), dtype=np.uint8)
+    for tile, roi_mask in zip(tiles, tile_masks):
+        if roi_mask is None:
+            continue
+
+        x1 = tile[0]
+        y1 = tile[1]
+        x2 = tile[2]
+        y2 = tile[3]
+        spot_mask[y1:y2, x1:x2] = roi_mask
+    return spot_mask
+
+
+def block_spot_mask(paper, rect, params):
+    '''
+    Builds the spot mask of the region rect = (x, y, w, h) for all candidate tiles at once.
+    The histograms of the candidates are counted together (see ts.tile_histograms), and the
+    threshold of every tile is computed from its histogram by the same rules as in
+    threshold_rect, so the result is identical to tile_spot_mask.
+    '''
+    win_size = params.win_size
+    region_img = extended_region(paper, *rect)
+
+    def tile_img(idx):
+        y1 = idx[0] * win_size
+        x1 = idx[1] * win_size
+        return region_img[y1:y1+win_size, x1:x1+win_size]
+
+    candidates, _ = spot_candidates(paper, rect, params)
+    candidate_idx = np.nonzero(candidates)
+    hists = ts.tile_histograms(region_img, win_size, candidates)
+
+    def candidate_img(idx):
+        return tile_img((candidate_idx[0][idx[0]], candidate_idx[1][idx[0]]))
+
+    thresh, accept = spot_thresholds(paper, hists, candidate_img, params)
+    # rejected tiles get a threshold that no 8-bit pixel can exceed
+    tile_thresh = np.full(candidates.shape, 255, dtype=np.uint8)
+    tile_thresh[candidate_idx] = np.where(accept, thresh, 255)
+    thresh_map = ts.expand_tiles(tile_thresh, win_size, region_img.shape)
+    return cv2.compare(region_img, thresh_map, cv2.CMP_GT)
+
+
+def local_spot_mask(paper, rect, params):
+    '''
+    Builds the spot mask of the region rect = (x, y, w, h) with a threshold for every pixel,
+    from the mean and standard deviation of the (2*win_size+1) square window around it.  The
+    window sums come from integral images, so the cost per pixel does not depend on the
+    window, and there are no tile seams.  The "niblack" engine thresholds at
+    mean + k*std, and the "sauvola" engine at 255 - (255-mean)*(1 + k*(std/R - 1)), Sauvola's
+    threshold for bright spots.
+
+    The rules of spot_thresholds are applied to each pixel: threshold_adjustment is added
+    to the threshold, which is raised to at least min_dist_from_median above the median of
+    the paper, and pixels whose window has a range of values below min_range are not spots.
+    The range is taken over the same window as the mean, 2*win_size+1 pixels square (201
+    pixels for the default tile of 100), so that each pixel is judged on the values around
+    it rather than on those of the tile it falls in.  The window covers four times the area
+    of a tile, so min_range rejects fewer pixels than it rejects tiles.
+
+    Both engines are experimental, and are not used unless chosen.  On the Validation
+    images they agree poorly with the tiled engines, a mean Dice coefficient of about 0.56
+    for "niblack" and 0.49 for "sauvola" (see the "local_threshold" benchmark in bench_vsa):
+    "niblack" marks 1.1 to 4 times as many pixels, growing halos around the spots, and
+    "sauvola" mostly fewer, down to a third, losing the faint edges of the spots.  Neither has the
+    Otsu threshold of a tile to decide whether a window holds a spot at all, so both find
+    spots in texture where the tiled engines find none, such as on test_data/ruler.tif.
+    Raising k removes those at the cost of the real spots.
+    '''
+    region_img = extended_region(paper, *rect)
+    h, w = region_img.shape
+    radius = params.win_size
+    side = 2*radius + 1
+    # Padding with zeros makes every window sum a difference of four integral image values
+    padded = cv2.copyMakeBorder(region_img, radius, radius, radius, radius, cv2.BORDER_CONSTANT, value=0)
+    sums, sq_sums = cv2.integral2(padded, sdepth=cv2.CV_64F, sqdepth=cv2.CV_64F)
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (side, side))
+    window_range = cv2.subtract(cv2.dilate(region_img, kernel), cv2.erode(region_img, kernel))
+    floor = paper.median + max(params.min_dist_from_median, 0)
+
+    cols = np.arange(w)
+    col_count = np.minimum(cols + radius + 1, w) - np.maximum(cols - radius, 0)
+    spot_mask = np.zeros((h, w), dtype=np.uint8)
+    for first in range(0, h, LOCAL_STRIP_ROWS):
+        last = min(first + LOCAL_STRIP_ROWS, h)
+        rows = np.arange(first, last)
+        row_count = np.minimum(rows + radius + 1, h) - np.maximum(rows - radius, 0)
+        count = row_count[:, None] * col_count
+        mean = _window_sums(sums, first, last, w, side) / count
+        std = np.sqrt(np.maximum(_window_sums(sq_sums, first, last, w, side) / count - mean*mean, 0.0))
+        if params.engine == "sauvola":
+            thresh = 255.0 - (255.0 - mean) * (1.0 + SAUVOLA_K * (std / SAUVOLA_R - 1.0))
+        else:
+            thresh = mean + NIBLACK_K * std
+        thresh = np.clip(np.floor(thresh) + params.threshold_adjustment, 1, 255)
+        thresh = np.maximum(thresh, floor)
+        spots = (region_img[first:last] > thresh) & (window_range[first:last] >= params.min_range)
+        spot_mask[first:last][spots] = 255
+    return spot_mask
+
+
+def segment_spots(paper, params):
+    '''
+    Segments the spots over the paper.  The region around the paper is divided into win_size
+    tiles, each thresholded on its own, and only the tiles that may hold spots are thresholded
+    (see spot_candidates).  The "tile" engine thresholds the tiles one at a time, the "block"
+    engine all at once, with the same result, and the "niblack" and "sauvola" engines use
+    local thresholds instead (see local_spot_mask).  Returns the Spots, off the paper removed.
+    '''
+    rect = tile_crop(paper.bbox, params.win_size, paper.mask.shape)
+    if params.engine == "tile":
+        region_mask = tile_spot_mask(paper, rect, params)
+    elif params.engine in ("niblack", "sauvola"):
+        region_mask = local_spot_mask(paper, rect, params)
+    else:
+        region_mask = block_spot_mask(paper, rect, params)
+
+    x, y, w, h = rect
+    region_mask = np.where(paper.mask[y:y+h, x:x+w]==0, 0, region_mask).astype(np.uint8, copy=False)
+    spot_contours, _ = cv2.findContours(image=region_mask, mode=cv2.RETR_EXTERNAL,
+                                        method=cv2.CHAIN_APPROX_NONE, offset=(x, y))
+    return Spots(rect, _frozen(region_mask), PolygonSet.from_contours(spot_contours))
+
+
+def label_spots(img, polygons, edge_distances):
+    '''
+    Labels the filled spots once and gathers the pixel statistics of every spot with
+    np.bincount over the labeled pixels.  External contours never touch when filled, so
+    each polygon is exactly one connected component, holes included.  Only the bounding
+    box of the polygons is labeled.  edge_distances(xs, ys) gives the distance to the edge
+    of the paper of the pixels at (xs, ys).
+
+    returns:
+        dictionary of arrays in polygon order: 'bbox' (x, y, w, h), 'pixel_count',
+        'dist_sum' (sum of the distances to the edge of the paper) and 'intensity_sum'
+        (sum of img)
+    '''
+    spot_stats = {}
+    if len(polygons) == 0:
+        spot_stats['bbox'] = np.zeros((0, 4), dtype=np.int64)
+        for key in ['pixel_count', 'dist_sum', 'intensity_sum']:
+            spot_stats[key] = np.zeros(0)
+        return spot_stats
+    boxes = polygons.bboxes()
+    x1, y1 = boxes[:, 0].min(), boxes[:, 1].min()
+    x2, y2 = (boxes[:, 0]+boxes[:, 2]).max(), (boxes[:, 1]+boxes[:, 3]).max()
+
+    filled = np.zeros((y2-y1, x2-x1), dtype=np.uint8)
+    cv2.drawContours(filled, polygons.to_contours(), -1, color=255, thickness=cv2.FILLED, offset=(-x1, -y1))
+    label_count, labels, stats, _ = cv2.connectedComponentsWithStats(filled, connectivity=8, ltype=cv2.CV_32S)
+    first_points = polygons.coords[polygons.offsets[:-1]] - (x1, y1)
+    spot_labels = labels[first_points[:, 1], first_points[:, 0]]
+
+    inside = labels > 0
+    pixel_labels = labels[inside]
+    ys, xs = np.nonzero(inside)
+    dist_sum = np.bincount(pixel_labels, weights=edge_distances(xs+x1, ys+y1), minlength=label_count)
+    intensity_sum = np.bincount(pixel_labels, weights=img[y1:y2, x1:x2][inside], minlength=label_count)
+    spot_stats['bbox'] = stats[spot_labels, :4] + (x1, y1, 0, 0)
+    spot_stats['pixel_count'] = stats[spot_labels, cv2.CC_STAT_AREA]
+    spot_stats['dist_sum'] = dist_sum[spot_labels]
+    spot_stats['intensity_sum'] = intensity_sum[spot_labels]
+    return spot_stats
+
+
+def measure_spot_geometry(img, polygons, edge_distances):
+    """
+    Computes the pixel measurements of the given PolygonSet of spots, which do not depend
+    on the resolution or on the volume calibration.  The pixel statistics come from a labeled
+    image (see label_spots), and the perimeters and areas of all the polygons are
+    computed together.
+
+    returns:
+        list of dictionaries, one per polygon
+    """
+    spot_stats = label_spots(img, polygons, edge_distances)
+    perimeters = polygons.perimeters().tolist()
+    areas = polygons.areas().tolist()
+    geometry_list = []
+    for idx in range(len(polygons)):
+        geometry = {}
+
+        # img_x, img_y, img_w, img_h
+        x, y, w, h = spot_stats['bbox'][idx].tolist()
+        geometry['img_x'] = x
+        geometry['img_y'] = y
+        geometry['img_w'] = w
+        geometry['img_h'] = h
+
+        # perimeter_pix, area_pix2 and circularity
+        geometry['perimeter_pix'] = perimeters[idx]
+        geometry['area_pix2'] = areas[idx]
+        L = perimeters[idx]
+        if L <= 0.0:
+            geometry['circularity'] = 0.0
+        else:
+            geometry['circularity'] = (4.0*math.pi*areas[idx])/(L*L)
+
+        # pixel_count, intensity_sum and dist_to_edge_pix over the filled spot
+        count = spot_stats['pixel_count'][idx]
+        geometry['pixel_count'] = int(count)
+        geometry['intensity_sum'] = spot_stats['intensity_sum'][idx]
+        geometry['ave_dist_to_edge_pix'] = spot_stats['dist_sum'][idx]/count
+        geometry_list.append(geometry)
+    return geometry_list
+
+
+def geometry_columns(geometry_list):
+    ''' Returns the pixel measurements of measure_spot_geometry() as one array per column. '''
+    columns = {}
+    for key in GEOMETRY_COLUMNS:
+        columns[key] = np.array([geometry[key] for geometry in geometry_list], dtype=GEOMETRY_COLUMNS[key])
+    return columns
+
+
+def scale_spots(columns, polygons, pix_per_cm, img_scale, area_cm2, volume_ul):
+    '''
+    Builds the SpotTable of the spots, sorted by volume, from the geometry columns, the
+    PolygonSet of the spots and their physical areas and volumes.  pix_per_cm is the
+    resolution of the image measured.  The classes are left unset.  When the image was
+    reduced by img_scale, the cm columns are computed at the resolution measured, and the
+    pixel measurements and the points of the table are then scaled back to the pixels of
+    the image file, so that they line up with img_x, img_y, img_w and img_h.  The polygons
+    passed in, which are drawn and edited on the image measured, are left unchanged.
+    '''
+    order = np.argsort(-volume_ul, kind='stable')
+    columns = {key: column[order] for key, column in columns.items()}
+    columns['perimeter_cm'] = columns['perimeter_pix'] / pix_per_cm
+    columns['area_cm2'] = area_cm2[order]
+    columns['volume_ul'] = volume_ul[order]
+    columns['ave_dist_to_edge_cm'] = columns['ave_dist_to_edge_pix'] / pix_per_cm
+    if img_scale != 1.0:
+        for key in ['img_x', 'img_y', 'img_w', 'img_h']:
+            columns[key] = np.rint(columns[key] / img_scale).astype(np.int64)
+        for key in ['perimeter_pix', 'ave_dist_to_edge_pix']:
+            columns[key] = columns[key] / img_scale
+        columns['area_pix2'] = columns['area_pix2'] / (img_scale**2)
+        polygons = PolygonSet(np.rint(polygons.coords / img_scale), polygons.offsets)
+    return SpotTable(columns, polygons.take(order))
@@ -40,7 +40,6 @@ To Do:
 import os
 import sys
 import configparser
-import numpy as np
 import cv2
 import json
 from datetime import datetime
@@ -66,6 +65,8 @@ from PyQt6.QtWidgets import (
     QMessageBox,
     QMenuBar)
 from .vsa import VsaProcessor
+from .spot_table import NANO, MICRO, PRIMARY
+from . import vsa_results
 from .vsa_viewer import VsaViewer, VsaView
 from . import polygon_tools as pt
 from .area_volume_map import AreaVolumeMap
@@ -421,6 +422,8 @@ class MainWin(QWidget):
         This function is called when a new image is loaded, whether this via the "File/Open Image..." menu, or via opening
         a session file.
         '''
+        # The image is analyzed at the resolution of the file: the viewer, the edits and the
+        # session all use the coordinates of the file, so analysis_pix_per_cm is left unset
         if not self.vsa_processor.open_image(self.pathname):
             return False
         fname = os.path.basename(self.pathname)
@@ -685,7 +688,7 @@ class MainWin(QWidget):
             selection[3] += selection[1]
             selection[1] = 0
         if ((selection[0] < 0) or (selection[1] < 0) or (selection[2] <=0) or (selection[3] <= 0)):
-            self.vsa_processor.segment_spots(threshold_adjustment, min_range, min_dist_from_median)
+            self.vsa_processor.segment_spots(threshold_adjustment, min_range, min_dist_from_median, self.spinbox_resolution.value())
             self.update_measurements()
             self.viewer.set_spot_annotation(self.vsa_processor.spot_polygon_properties)
         else:
@@ -702,31 +705,15 @@ class MainWin(QWidget):
         area_pix = self.vsa_processor.measure_spots(self.volume_mapper, self.spinbox_resolution.value(), size_thresh_list)
 
 
-        # JGP - finish this...
-        props_primary = [p for p in self.vsa_processor.spot_polygon_properties if p['class']=='primary']
-        props_micro = [p for p in self.vsa_processor.spot_polygon_properties if p['class']=='micro']
-        props_nano = [p for p in self.vsa_processor.spot_polygon_properties if p['class']=='nano']
+        spot_table = self.vsa_processor.spot_table
+        totals = spot_table.class_totals()
+        counts = totals['count'].tolist()
         count = len(self.vsa_processor.spot_polygons)
-        count_str = f"{count} ({len(props_primary)}, {len(props_micro)}, {len(props_nano)})"
-
-        vol_primary = 0.0
-        vol_micro = 0.0
-        vol_nano = 0.0
-        area_cm2 = 0.0
-        weighted_distance = 0.0
-        for poly in self.vsa_processor.spot_polygon_properties:
-            if poly['class'] == 'junk':
-                continue
-            elif poly['class'] == 'nano':
-                vol_nano += poly['volume_ul']
-            elif poly['class'] == 'micro':
-                vol_micro += poly['volume_ul']
-            else:
-                vol_primary += poly['volume_ul']
+        count_str = f"{count} ({counts[PRIMARY]}, {counts[MICRO]}, {counts[NANO]})"
 
-            
-            area_cm2 += poly['area_cm2']
-            weighted_distance += (poly['area_cm2'] * poly['ave_dist_to_edge_cm'])
+        vol_nano, vol_micro, vol_primary = totals['volume_ul'][NANO:].tolist()
+        area_cm2 = sum(totals['area_cm2'][NANO:].tolist(), 0.0)
+        weighted_distance = sum(totals['area_dist'][NANO:].tolist(), 0.0)
         vol_total = vol_primary + vol_micro + vol_nano
         vol_str = f"{vol_total:.3f} ({vol_primary:.3f}, {vol_micro:.3f}, {vol_nano:.3f})"
         if area_cm2 > 0.001:
@@ -789,37 +776,11 @@ class MainWin(QWidget):
                 return False
         sample_id = self.line_edit_sample_id.text()
         mouse_id = self.line_edit_mouse_id.text()
-        heading_list = ['void_class','img_x', 'img_y', 'img_w', 'img_h',
-                        'perimeter_cm', 'area_cm2', 'volume_ul',
-                        'circularity', 'distance_to_edge']
-
-        csv_data = []
-        csv_data.append(['sample_id', sample_id])
-        csv_data.append(['mouse_id', mouse_id])
-        csv_data.append(['date_time', datetime.now().strftime("%Y/%m/%d:%H:%M:%S")])
-        csv_data.append(['file_name', self.pathname])
-        csv_data.append([])
-        csv_data.append(heading_list)
-
-        for poly_props in self.vsa_processor.spot_polygon_properties:
-            if poly_props['class'] == 'junk':
-                continue
-            vc = poly_props['class']
-            x = poly_props['img_x']
-            y = poly_props['img_y']
-            w = poly_props['img_w']
-            h = poly_props['img_h']
-            perim_cm = poly_props['perimeter_cm']
-            area_cm2 = poly_props['area_cm2']
-            volume_ul = poly_props['volume_ul']
-            circ = poly_props['circularity']
-            dist_cm = poly_props['ave_dist_to_edge_cm']
-            csv_data.append([vc, f'{x}', f'{y}', f'{w}', f'{h}', f'{perim_cm:.2f}', f'{area_cm2:.2f}', f'{volume_ul:.2f}', f'{circ:.4f}', f'{dist_cm:.2f}'])
+        date_time = datetime.now().strftime("%Y/%m/%d:%H:%M:%S")
+        csv_data = vsa_results.sample_rows(self.vsa_processor.spot_table, sample_id, mouse_id, date_time, self.pathname)
 
         try:
-            with open(filename, mode="w") as csv_file:
-                for row in csv_data:
-                    csv_file.write(", ".join(row)+"\n")
+            vsa_results.write_csv(filename, csv_data)
         except:
             self.message_box(f"The sample results file could not be written:\n    {filename}")
             return False
@@ -837,23 +798,10 @@ class MainWin(QWidget):
             filename = file_tup[0]
             if not filename:
                 return False
-        csv_data = []
         try:
-            with open(filename) as csv_file:
-                for line in csv_file:
-                    record = []
-                    for token in line.split(','):
-                        record.append(token.strip())
-                    csv_data.append(record)
+            csv_data = vsa_results.read_csv(filename)
         except:
-            csv_data = [['sample_id', 'mouse_id', 'date_time', 'paper_area',
-                         'micro_void_thresh_ul', 'nano_void_thresh_ul', 'min_void_size_ul',
-                         'primary_count', 'micro_count', 'nano_count', 'total_count',
-                         'primary_volume_ul', 'micro_volume_ul', 'nano_volume_ul', 
-                         'primary_ave_volume_ul', 'micro_ave_volume_ul', 'nano_ave_volume_ul', 
-                         'primary_ave_circularity', 'micro_ave_circularity', 'nano_ave_circularity', 
-                         'primary_ave_distance_to_edge', 'micro_ave_distance_to_edge', 'nano_ave_distance_to_edge', 
-                         'total_volume_ul', 'ave_volume', 'ave_circularity', 'ave_distance_to_edge']]
+            csv_data = [vsa_results.SUMMARY_HEADING]
 
         sample_id = self.line_edit_sample_id.text()
         mouse_id = self.line_edit_mouse_id.text()
@@ -866,117 +814,14 @@ class MainWin(QWidget):
             if (ret == QMessageBox.StandardButton.Yes):
                 csv_data = [record for record in csv_data if (record[0]!=sample_id)]
 
-        micro_void_thresh_ul = self.spinbox_micro_void_thresh.value()
-        nano_void_thresh_ul = self.spinbox_nano_void_thresh.value()
-        min_void_size_ul = self.spinbox_min_void_size.value()
-        pix_per_cm = self.spinbox_resolution.value()
-        primary_count = 0
-        micro_count = 0
-        nano_count = 0
-        vol_primary = 0.0
-        vol_micro = 0.0
-        vol_nano = 0.0
-        circ_primary = 0.0
-        circ_micro = 0.0
-        circ_nano = 0.0
-        dist_primary = 0.0
-        dist_micro = 0.0
-        dist_nano = 0.0
-
-        for poly_props in self.vsa_processor.spot_polygon_properties:
-            area_cm2 = poly_props['area_cm2']
-            volume_ul = poly_props['volume_ul']
-            if poly_props['class'] == 'nano':
-                nano_count += 1
-                vol_nano += volume_ul
-                circ_nano += poly_props['circularity']
-                dist_nano += poly_props['ave_dist_to_edge_cm']
-            elif poly_props['class'] == 'micro':
-                micro_count += 1
-                vol_micro += volume_ul
-                circ_micro += poly_props['circularity']
-                dist_micro += poly_props['ave_dist_to_edge_cm']
-            elif poly_props['class'] == 'primary':
-                primary_count += 1
-                vol_primary += volume_ul
-                circ_primary += poly_props['circularity']
-                dist_primary += poly_props['ave_dist_to_edge_cm']
-        if primary_count + micro_count + nano_count==0:
-            ave_circularity=np.nan
-            ave_dist=np.nan
-            vol_total=0
-            ave_vol=np.nan
-        else:
-            ave_circularity = (circ_primary + circ_micro + circ_nano)/(primary_count + micro_count + nano_count)
-            ave_dist = (dist_primary + dist_micro + dist_nano)/(primary_count + micro_count + nano_count)
-            vol_total = vol_primary + vol_micro + vol_nano
-            ave_vol= vol_total/(primary_count + micro_count + nano_count)
-        if primary_count==0:
-            ave_primary_vol=np.nan
-            ave_primary_circ=np.nan
-            ave_primary_dist=np.nan
-        else:
-            ave_primary_vol=vol_primary/primary_count
-            ave_primary_circ=circ_primary/primary_count
-            ave_primary_dist=dist_primary/primary_count
-        if micro_count==0:
-            ave_micro_vol=np.nan
-            ave_micro_circ=np.nan
-            ave_micro_dist=np.nan
-        else:
-            ave_micro_vol=vol_micro/micro_count
-            ave_micro_circ=circ_micro/micro_count
-            ave_micro_dist=dist_micro/micro_count
-        if nano_count==0:
-            ave_nano_vol=np.nan
-            ave_nano_circ=np.nan
-            ave_nano_dist=np.nan
-        else:
-            ave_nano_vol=vol_nano/nano_count
-            ave_nano_circ=circ_nano/nano_count
-            ave_nano_dist=dist_nano/nano_count
-
-        record = []
-        record.append(sample_id)                                        # sample_id
-        record.append(mouse_id)                                         # mouse_id
-        record.append(datetime.now().strftime("%Y/%m/%d:%H:%M:%S"))     # date_time
-        record.append(f"{pt.polygon_area(self.vsa_processor.paper_polygon):1f}")
-        record.append(f"{micro_void_thresh_ul:.1f}")                    # micro_void_thresh_ul
-        record.append(f"{nano_void_thresh_ul:.1f}") 
-        record.append(f"{min_void_size_ul:.1f}") 
-
-        record.append(str(primary_count))                               # primary_count
-        record.append(str(micro_count))                                 # micro_count
-        record.append(str(nano_count))                                  # nano_count
-        record.append(str(primary_count+micro_count+nano_count))        # total_count
-
-        record.append(f"{vol_primary:.1f}")                             # primary_volume_ul
-        record.append(f"{vol_micro:.1f}")                               # micro_volume_ul
-        record.append(f"{vol_nano:.1f}") 
-
-        record.append(f"{ave_primary_vol:.3f}")               # primary_ave_volume_ul
-        record.append(f"{ave_micro_vol:.3f}")                   # micro_ave_volume_ul
-        record.append(f"{ave_nano_vol:.3f}")
-
-        record.append(f"{ave_primary_circ:.3f}")              # primary_ave_circularity_ul
-        record.append(f"{ave_micro_circ:.3f}")                  # micro_ave_circularity_ul
-        record.append(f"{ave_nano_circ:.3f}")
-
-        record.append(f"{ave_primary_dist:.3f}")              # primary_ave_distance_to_edge_ul
-        record.append(f"{ave_micro_dist:.3f}")                  # micro_ave_distance_to_edge_ul
-        record.append(f"{ave_nano_dist:.3f}")
-
-        record.append(f"{vol_total:.1f}")                               # total_volume_ul
-        record.append(f"{ave_vol:.3f}")   # total_ave_volume_ul
-        record.append(f"{ave_circularity:.3f}")                         # ave_circularity
-        record.append(f"{ave_dist:.1f}")                                # ave_distance_to_edge
-
+        size_thresh_list = [self.spinbox_min_void_size.value(), self.spinbox_nano_void_thresh.value(), self.spinbox_micro_void_thresh.value()]
+        date_time = datetime.now().strftime("%Y/%m/%d:%H:%M:%S")
+        record = vsa_results.summary_record(self.vsa_processor.spot_table, sample_id, mouse_id, date_time,
+                                            self.vsa_processor.get_paper_area(), size_thresh_list)
         csv_data.append(record)
 
         try:
-            with open(filename, mode="w") as csv_file:
-                for row in csv_data:
-                    csv_file.write(", ".join(row)+"\n")
+            vsa_results.write_csv(filename, csv_data)
         except:
             self.message_box(f"The results file could not be written:\n    {filename}")
             return False
@@ -1009,11 +854,10 @@ class MainWin(QWidget):
         json_dict['cal_pix_per_cm'] = self.spinbox_resolution.value()
         json_dict['cal_known_vol'] = self.spinbox_known_volume.value()
         json_dict['volume_calibration_data'] = self.vol_cal_points
-        json_dict['spot_polygons'] = self.vsa_processor.spot_polygons
+        json_dict['spot_polygons'] = self.vsa_processor.spot_polygons.to_lists()
 
-        json_str = json.dumps(json_dict, indent=4)
         with open(filename, "w") as file:
-            file.write(json_str)
+            json.dump(json_dict, file, indent=4)
 
         self.need_to_save = False
         return True
@@ -0,0 +1,155 @@
+# Spoti-find - Copyright (C) 2025 The Jackson Laboratory, Inc.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+
+"""
+Copyright The Jackson Laboratory, 2025
+
+The per-sample and summary results files, as rows of strings, shared by the GUI
+and the batch command.  Nothing here depends on Qt.
+"""
+import numpy as np
+from .spot_table import NANO
+
+SAMPLE_HEADING = ['void_class', 'img_x', 'img_y', 'img_w', 'img_h',
+                  'perimeter_cm', 'area_cm2', 'volume_ul',
+                  'circularity', 'distance_to_edge']
+
+SUMMARY_HEADING = ['sample_id', 'mouse_id', 'date_time', 'paper_area',
+                   'micro_void_thresh_ul', 'nano_void_thresh_ul', 'min_void_size_ul',
+                   'primary_count', 'micro_count', 'nano_count', 'total_count',
+                   'primary_volume_ul', 'micro_volume_ul', 'nano_volume_ul',
+                   'primary_ave_volume_ul', 'micro_ave_volume_ul', 'nano_ave_volume_ul',
+                   'primary_ave_circularity', 'micro_ave_circularity', 'nano_ave_circularity',
+                   'primary_ave_distance_to_edge', 'micro_ave_distance_to_edge', 'nano_ave_distance_to_edge',
+                   'total_volume_ul', 'ave_volume', 'ave_circularity', 'ave_distance_to_edge']
+
+
+def sample_rows(spot_table, sample_id, mouse_id, date_time, file_name):
+    '''
+    Returns the rows of the per-sample results file: the sample information, then one
+    row per spot that is not junk, from the measured SpotTable.
+    '''
+    csv_data = []
+    csv_data.append(['sample_id', sample_id])
+    csv_data.append(['mouse_id', mouse_id])
+    csv_data.append(['date_time', date_time])
+    csv_data.append(['file_name', file_name])
+    csv_data.append([])
+    csv_data.append(SAMPLE_HEADING)
+
+    for poly_props in spot_table:
+        if poly_props['class'] == 'junk':
+            continue
+        vc = poly_props['class']
+        x = poly_props['img_x']
+        y = poly_props['img_y']
+        w = poly_props['img_w']
+        h = poly_props['img_h']
+        perim_cm = poly_props['perimeter_cm']
+        area_cm2 = poly_props['area_cm2']
+        volume_ul = poly_props['volume_ul']
+        circ = poly_props['circularity']
+        dist_cm = poly_props['ave_dist_to_edge_cm']
+        csv_data.append([vc, f'{x}', f'{y}', f'{w}', f'{h}', f'{perim_cm:.2f}', f'{area_cm2:.2f}', f'{volume_ul:.2f}', f'{circ:.4f}', f'{dist_cm:.2f}'])
+    return csv_data
+
+
+def summary_record(spot_table, sample_id, mouse_id, date_time, paper_area, size_thresh_list):
+    '''
+    Returns the summary results row of one sample, from the measured SpotTable, the paper
+    area in pixels and the size thresholds, [min_void_size, nano_void_thresh, micro_void_thresh].
+    '''
+    min_void_size_ul, nano_void_thresh_ul, micro_void_thresh_ul = size_thresh_list
+    totals = spot_table.class_totals()
+    means = spot_table.class_means(totals)
+    nano_count, micro_count, primary_count = totals['count'][NANO:].tolist()
+    vol_nano, vol_micro, vol_primary = totals['volume_ul'][NANO:].tolist()
+    circ_nano, circ_micro, circ_primary = totals['circularity'][NANO:].tolist()
+    dist_nano, dist_micro, dist_primary = totals['ave_dist_to_edge_cm'][NANO:].tolist()
+    ave_nano_vol, ave_micro_vol, ave_primary_vol = means['volume_ul'][NANO:].tolist()
+    ave_nano_circ, ave_micro_circ, ave_primary_circ = means['circularity'][NANO:].tolist()
+    ave_nano_dist, ave_micro_dist, ave_primary_dist = means['ave_dist_to_edge_cm'][NANO:].tolist()
+    if primary_count + micro_count + nano_count==0:
+        ave_circularity=np.nan
+        ave_dist=np.nan
+        vol_total=0
+        ave_vol=np.nan
+    else:
+        ave_circularity = (circ_primary + circ_micro + circ_nano)/(primary_count + micro_count + nano_count)
+        ave_dist = (dist_primary + dist_micro + dist_nano)/(primary_count + micro_count + nano_count)
+        vol_total = vol_primary + vol_micro + vol_nano
+        ave_vol= vol_total/(primary_count + micro_count + nano_count)
+
+    record = []
+    record.append(sample_id)                                        # sample_id
+    record.append(mouse_id)                                         # mouse_id
+    record.append(date_time)                                        # date_time
+    record.append(f"{paper_area:1f}")
+    record.append(f"{micro_void_thresh_ul:.1f}")                    # micro_void_thresh_ul
+    record.append(f"{nano_void_thresh_ul:.1f}")
+    record.append(f"{min_void_size_ul:.1f}")
+
+    record.append(str(primary_count))                               # primary_count
+    record.append(str(micro_count))                                 # micro_count
+    record.append(str(nano_count))                                  # nano_count
+    record.append(str(primary_count+micro_count+nano_count))        # total_count
+
+    record.append(f"{vol_primary:.1f}")                             # primary_volume_ul
+    record.append(f"{vol_micro:.1f}")                               # micro_volume_ul
+    record.append(f"{vol_nano:.1f}")
+
+    record.append(f"{ave_primary_vol:.3f}")                         # primary_ave_volume_ul
+    record.append(f"{ave_micro_vol:.3f}")                           # micro_ave_volume_ul
+    record.append(f"{ave_nano_vol:.3f}")
+
+    record.append(f"{ave_primary_circ:.3f}")                        # primary_ave_circularity_ul
+    record.append(f"{ave_micro_circ:.3f}")                          # micro_ave_circularity_ul
+    record.append(f"{ave_nano_circ:.3f}")
+
+    record.append(f"{ave_primary_dist:.3f}")                        # primary_ave_distance_to_edge_ul
+    record.append(f"{ave_micro_dist:.3f}")                          # micro_ave_distance_to_edge_ul
+    record.append(f"{ave_nano_dist:.3f}")
+
+    record.append(f"{vol_total:.1f}")                               # total_volume_ul
+    record.append(f"{ave_vol:.3f}")                                 # total_ave_volume_ul
+    record.append(f"{ave_circularity:.3f}")                         # ave_circularity
+    record.append(f"{ave_dist:.1f}")                                # ave_distance_to_edge
+    return record
+
+
+def read_csv(filename):
+    '''
+    Reads a results file written by write_csv() as a list of rows of stripped strings.
+    Raises OSError when the file cannot be read.
+    '''
+    csv_data = []
+    with open(filename) as csv_file:
+        for line in csv_file:
+            record = []
+            for token in line.split(','):
+                record.append(token.strip())
+            csv_data.append(record)
+    return csv_data
+
+
+def write_csv(filename, csv_data):
+    '''
+    Writes the rows of strings to a results file.  Raises OSError when the file cannot be written.
+    '''
+    with open(filename, mode="w") as csv_file:
+        for row in csv_data:
+            csv_file.write(", ".join(row)+"\n")
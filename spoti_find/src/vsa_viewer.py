@@ -25,6 +25,16 @@ from PyQt6.QtWidgets import (QGraphicsRectItem, QGraphicsScene, QGraphicsView, Q
     QGroupBox, QVBoxLayout, QHBoxLayout, QCheckBox, QDoubleSpinBox, QLabel, QSlider, QRadioButton)
 from . import polygon_tools as pt
 
+
+def to_qpolygon(points):
+    '''
+    Converts a polygon, a list of [x, y] points or an (N, 2) array such as a PolygonSet
+    entry, to a QPolygonF.
+    '''
+    if hasattr(points, 'tolist'):
+        points = points.tolist()
+    return QPolygonF([QPointF(x, y) for x, y in points])
+
 class VsaViewer(QGroupBox):
 
     def __init__(self):
@@ -515,10 +525,7 @@ class VsaView(QGraphicsView):
             else:
                 pen = pen_primary
 
-            qpoly = QPolygonF()
-            for point in poly:
-                qpoly.append(QPointF(point[0], point[1]))
-            item = self.scene.addPolygon(qpoly, pen)
+            item = self.scene.addPolygon(to_qpolygon(poly), pen)
             item.setZValue(2)
             if props['class'] == 'junk':
                 self.junk_spot_polygon_items.append(item)
@@ -544,10 +551,7 @@ class VsaView(QGraphicsView):
         self._clear_candidate_polygons()
         pen = QPen(self.candidate_annotation_color, self.line_width)
         for poly in candidate_polygons:
-            qpoly = QPolygonF()
-            for point in poly:
-                qpoly.append(QPointF(point[0], point[1]))
-            item = self.scene.addPolygon(qpoly, pen)
+            item = self.scene.addPolygon(to_qpolygon(poly), pen)
             item.setZValue(3)
             self.candidate_polygon_items.append(item)
         return